@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+# Social Graphs for Coercion and Trust Spreading
+#
+# BasiliskAI treats agents as independent; an AgentGraph connects them, so coercion
+# and trust can spread from neighbor to neighbor. The graph is undirected and stored in
+# compressed sparse row (CSR) form: the neighbors of agent i are
+# indices[indptr[i]:indptr[i + 1]], two flat integer arrays with no per-edge Python
+# objects. A propagation round gathers every agent's neighbor states and counts them
+# with one cumulative sum per block of agents, so it costs O(edges).
+#
+# Graph files: GRAPH_MAGIC, version (u32), index width in bytes (u32), N (u64) and the
+# number of CSR entries (u64), then every agent's degree (u32), padding to 8 bytes and
+# the neighbor indices (u32, or u64 beyond 2^32 agents), all little-endian. Indices are
+# memory-mapped on load, so large graphs open instantly and share the page cache.
+
+import argparse
+import bisect
+import os
+import struct
+import sys
+from array import array
+
+import microphone_quantum_basilisk as mqb
+from counter_rng import CounterRNG
+
+np = mqb.np
+
+GRAPH_MAGIC = b'QBGRAPH\x00'
+GRAPH_VERSION = 1
+GRAPH_HEADER = struct.Struct('<8sIIQQ')
+GRAPH_BLOCK = 1 << 16  # Agents per propagation block; a multiple of 64 for packed Basilisks
+SPREAD_THRESHOLD = 0.5  # Share of neighbors that must hold a state before an agent adopts it
+
+# Generator streams
+STREAM_SOURCES = 0
+STREAM_TARGETS = 1
+
+class AgentGraph:
+    """Undirected graph over N agents in CSR form, without self-loops or repeated edges."""
+    def __init__(self, N, indptr, indices):
+        if len(indptr) != N + 1:
+            raise ValueError("indptr must hold N + 1 offsets.")
+        self.N = N
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, N, sources, targets):
+        """Builds a graph from undirected edges (sources[k], targets[k]).
+
+        Self-loops and repeated edges are dropped. With NumPy, the edges are sorted as
+        one array of 64-bit keys, which is far faster than sorting row indices.
+        """
+        if np is not None:
+            sources = np.asarray(sources, dtype=np.int64)
+            targets = np.asarray(targets, dtype=np.int64)
+            keep = sources != targets
+            sources, targets = sources[keep], targets[keep]
+            keys = np.concatenate((sources * N + targets, targets * N + sources))
+            del sources, targets, keep
+            keys.sort()
+            if len(keys):
+                keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+            rows = keys // N
+            indptr = np.zeros(N + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=N), out=indptr[1:])
+            indices = (keys - rows * N).astype(_index_dtype(N))
+            return cls(N, indptr, indices)
+        pairs = sorted({(s, t) for u, v in zip(sources, targets) if u != v for s, t in ((u, v), (v, u))})
+        indptr = array('q', [0]) * (N + 1)
+        for s, t in pairs:
+            indptr[s + 1] += 1
+        for i in range(N):
+            indptr[i + 1] += indptr[i]
+        return cls(N, indptr, array('q', [t for s, t in pairs]))
+
+    @property
+    def edges(self):
+        """Number of undirected edges."""
+        return len(self.indices) // 2
+
+    def degrees(self, start=0, stop=None):
+        stop = self.N if stop is None else stop
+        if np is not None:
+            return np.diff(self.indptr[start:stop + 1])
+        return [self.indptr[i + 1] - self.indptr[i] for i in range(start, stop)]
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbor_counts(self, state, start=0, stop=None):
+        """Counts, for agents start..stop-1, the neighbors whose state is non-zero."""
+        stop = self.N if stop is None else stop
+        if np is not None:
+            lo, hi = int(self.indptr[start]), int(self.indptr[stop])
+            totals = np.zeros(hi - lo + 1, dtype=np.int64)
+            np.cumsum(state[self.indices[lo:hi]] != 0, out=totals[1:])
+            return totals[self.indptr[start + 1:stop + 1] - lo] - totals[self.indptr[start:stop] - lo]
+        return [sum(1 for j in self.indices[self.indptr[i]:self.indptr[i + 1]] if state[j])
+                for i in range(start, stop)]
+
+    def save(self, path):
+        """Writes the graph in the compact little-endian format; returns the file size."""
+        width = 4 if self.N <= 1 << 32 else 8
+        offset = _indices_offset(self.N)
+        with open(path, 'wb') as f:
+            f.write(GRAPH_HEADER.pack(GRAPH_MAGIC, GRAPH_VERSION, width, self.N, len(self.indices)))
+            if np is not None:
+                for start, stop in mqb.agent_blocks(self.N):
+                    f.write(self.degrees(start, stop).astype('<u4').tobytes())
+                f.write(bytes(offset - f.tell()))
+                np.ascontiguousarray(self.indices, dtype=f'<u{width}').tofile(f)
+            else:
+                degrees = array('I', self.degrees())
+                indices = array('I' if width == 4 else 'Q', self.indices)
+                if sys.byteorder == 'big':
+                    degrees.byteswap()
+                    indices.byteswap()
+                f.write(degrees.tobytes())
+                f.write(bytes(offset - f.tell()))
+                f.write(indices.tobytes())
+            return f.tell()
+
+    @classmethod
+    def load(cls, path):
+        """Reads a graph file; with NumPy the neighbor indices are a read-only memory map."""
+        with open(path, 'rb') as f:
+            header = f.read(GRAPH_HEADER.size)
+            if len(header) != GRAPH_HEADER.size or header[:len(GRAPH_MAGIC)] != GRAPH_MAGIC:
+                raise ValueError(f"{path} is not an agent graph file.")
+            magic, version, width, N, entries = GRAPH_HEADER.unpack(header)
+            if version != GRAPH_VERSION or width not in (4, 8):
+                raise ValueError(f"Unsupported agent graph version {version}.")
+            offset = _indices_offset(N)
+            if os.fstat(f.fileno()).st_size < offset + width * entries:
+                raise ValueError(f"{path} is truncated.")
+            if np is not None:
+                degrees = np.fromfile(f, dtype='<u4', count=N)
+                indptr = np.zeros(N + 1, dtype=np.int64)
+                np.cumsum(degrees, out=indptr[1:])
+                indices = (np.memmap(f, dtype=f'<u{width}', mode='r', offset=offset, shape=(entries,))
+                           if entries else np.empty(0, dtype=f'<u{width}'))
+                return cls(N, indptr, indices)
+            degrees = array('I')
+            degrees.frombytes(f.read(4 * N))
+            f.seek(offset)
+            indices = array('I' if width == 4 else 'Q')
+            indices.frombytes(f.read(width * entries))
+            if sys.byteorder == 'big':
+                degrees.byteswap()
+                indices.byteswap()
+            indptr = array('q', [0]) * (N + 1)
+            for i, degree in enumerate(degrees):
+                indptr[i + 1] = indptr[i] + degree
+            return cls(N, indptr, indices)
+
+def _index_dtype(N):
+    return np.uint32 if N <= 1 << 32 else np.int64
+
+def _indices_offset(N):
+    return -(-(GRAPH_HEADER.size + 4 * N) // 8) * 8
+
+# Graph generators; both are reproducible from (N, parameters, seed)
+def _endpoints(rng, stream, M, N, cumulative=None):
+    """Draws M agents uniformly, or weighted by the running totals `cumulative`."""
+    if not M:
+        return []
+    if np is not None:
+        rand_vals = rng.random_array(stream, M)
+        if cumulative is None:
+            return (rand_vals * N).astype(np.int64)
+        return _weighted_lookup(cumulative, rand_vals)
+    rand_vals = rng.random_array(stream, M)
+    if cumulative is None:
+        return [int(rand_val * N) for rand_val in rand_vals]
+    total = cumulative[-1]
+    return [min(bisect.bisect_right(cumulative, rand_val * total), N - 1) for rand_val in rand_vals]
+
+def _weighted_lookup(cumulative, rand_vals):
+    """Returns, for each draw in [0, 1), the first agent whose running total exceeds draw * total.
+
+    Equivalent to searchsorted(), which at millions of agents is dominated by cache
+    misses. A guide table gives each draw the first agent of its bucket, from where it
+    only steps past the few agents sharing that bucket. Bounds and draws are scaled by
+    the same factor, so a draw never falls below its bucket's bound.
+    """
+    N = len(cumulative)
+    width = cumulative[-1] / N
+    guide = np.searchsorted(cumulative, np.arange(N) * width, side='right')
+    rand_vals = rand_vals * N
+    agents = guide[np.minimum(rand_vals.astype(np.int64), N - 1)]
+    rand_vals *= width
+    active = np.flatnonzero(cumulative[agents] <= rand_vals)
+    while len(active):
+        agents[active] += 1
+        active = active[(agents[active] < N - 1) & (cumulative[agents[active]] <= rand_vals[active])]
+    return agents
+
+def erdos_renyi(N, mean_degree, seed=0):
+    """Random graph with N * mean_degree / 2 uniformly drawn edges (the G(n, M) model).
+
+    The few self-loops and repeated draws are dropped, so the mean degree comes out
+    marginally below `mean_degree`.
+    """
+    rng = CounterRNG(seed)
+    M = round(N * mean_degree / 2) if N > 1 else 0
+    return AgentGraph.from_edges(N, _endpoints(rng, STREAM_SOURCES, M, N), _endpoints(rng, STREAM_TARGETS, M, N))
+
+def scale_free(N, mean_degree, exponent=2.5, seed=0):
+    """Scale-free graph with degrees following a power law of the given exponent (> 2).
+
+    Uses the Chung-Lu model: agent i gets weight (i + 1)^(-1/(exponent - 1)) and both
+    ends of every edge are drawn in proportion to the weights, so the expected degree
+    of each agent follows its weight and low indices are the hubs. Unlike preferential
+    attachment it needs no sequential growth, so all edges are drawn in one pass.
+    """
+    if exponent <= 2:
+        raise ValueError("The power-law exponent must exceed 2.")
+    rng = CounterRNG(seed)
+    M = round(N * mean_degree / 2) if N > 1 else 0
+    if np is not None:
+        cumulative = np.cumsum(np.arange(1, N + 1, dtype=np.float64) ** (-1.0 / (exponent - 1)))
+    else:
+        cumulative, total = [], 0.0
+        for i in range(1, N + 1):
+            total += i ** (-1.0 / (exponent - 1))
+            cumulative.append(total)
+    return AgentGraph.from_edges(N, _endpoints(rng, STREAM_SOURCES, M, N, cumulative),
+                                 _endpoints(rng, STREAM_TARGETS, M, N, cumulative))
+
+# Propagation
+def contribution_state(basilisk):
+    """Returns the contributions as an array that can be indexed by neighbor arrays."""
+    contributions = basilisk.contributions.values
+    if np is not None and not isinstance(contributions, np.ndarray):  # An AgentBitset
+        return np.unpackbits(np.frombuffer(contributions.data, dtype=np.uint8), count=basilisk.N,
+                             bitorder='little')
+    return contributions
+
+def spread(basilisk, graph, rounds=1, threshold=SPREAD_THRESHOLD, adopt=1, stage='spread'):
+    """Runs synchronous rounds of threshold influence over the graph; returns the flips per round.
+
+    In each round, every agent whose contribution differs from `adopt` switches to it
+    once at least `threshold` of its neighbors hold it, all decided on the states at
+    the start of the round. Agents without neighbors never switch. Flips go through
+    flip_contributions(), so the running utility and any journal stay current. Rounds
+    stop early once one flips nobody.
+    """
+    if graph.N != basilisk.N:
+        raise ValueError(f"The graph has {graph.N} agents but the Basilisk has {basilisk.N}.")
+    flipped = []
+    for _ in range(rounds):
+        state = contribution_state(basilisk)
+        blocks = []
+        total = 0
+        for start, stop in mqb.agent_blocks(graph.N, GRAPH_BLOCK):
+            holding = graph.neighbor_counts(state, start, stop)
+            degrees = graph.degrees(start, stop)
+            if np is not None:
+                if not adopt:
+                    holding = degrees - holding
+                flips = (state[start:stop] != adopt) & (degrees > 0) & (holding >= threshold * degrees)
+                total += int(np.count_nonzero(flips))
+            else:
+                if not adopt:
+                    holding = [degree - held for degree, held in zip(degrees, holding)]
+                flips = [bool(state[i] != adopt and degree and held >= threshold * degree)
+                         for i, degree, held in zip(range(start, stop), degrees, holding)]
+                total += sum(flips)
+            blocks.append((start, flips))
+        flipped.append(total)
+        if not total:
+            break
+        for start, flips in blocks:
+            basilisk.flip_contributions(start, flips, stage)
+    return flipped
+
+def spread_coercion(basilisk, graph, rounds=1, threshold=SPREAD_THRESHOLD):
+    """Peer pressure: a non-contributor starts contributing once enough of its neighbors do."""
+    return spread(basilisk, graph, rounds, threshold, 1, 'coercion_spread')
+
+def spread_trust(basilisk, graph, rounds=1, threshold=SPREAD_THRESHOLD):
+    """Trust: a contributor stops contributing once enough of its neighbors have stopped."""
+    return spread(basilisk, graph, rounds, threshold, 0, 'trust_spread')
+
+GENERATORS = {'erdos-renyi': erdos_renyi, 'scale-free': scale_free}
+
+def main(argv=None):
+    """Command-line entry point: generates a graph and saves it."""
+    parser = argparse.ArgumentParser(description="Generate an agent graph for coercion and trust spreading.")
+    parser.add_argument('model', choices=GENERATORS, help="random graph model")
+    parser.add_argument('-N', '--agents', type=int, default=4302, help="number of agents (default: 4302)")
+    parser.add_argument('-d', '--mean-degree', type=float, default=10.0, help="mean degree (default: 10)")
+    parser.add_argument('--exponent', type=float, default=2.5, help="scale-free power-law exponent (default: 2.5)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument('-o', '--output', default='agents.graph', help="output path (default: agents.graph)")
+    args = parser.parse_args(argv)
+    if args.model == 'scale-free':
+        graph = scale_free(args.agents, args.mean_degree, args.exponent, args.seed)
+    else:
+        graph = erdos_renyi(args.agents, args.mean_degree, args.seed)
+    size = graph.save(args.output)
+    print(f"Saved {graph.N} agents and {graph.edges} edges to {args.output} ({size} bytes).")
+
+if __name__ == "__main__":
+    main()
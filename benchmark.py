@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+# Benchmark Suite for the Basilisk Mechanisms
+#
+# Sweeps the number of agents N over powers of ten and times every mechanism of
+# microphone_quantum_basilisk.py and run.py, reporting seconds per agent and the peak
+# memory each call allocates. Results are written as JSON so runs can be compared over
+# time. Noise comes from a seeded counter stream, and microphone capture goes through
+# FakePyAudio, so the suite is deterministic and needs no sound hardware.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from array import array
+
+import checkpoint
+import microphone_quantum_basilisk as mqb
+import run
+import signal_engine
+from counter_rng import CounterRNG, CounterStream
+
+MIN_AGENTS = 10 ** 3
+MAX_AGENTS = 10 ** 8
+LIST_AGENT_LIMIT = 10 ** 7  # Largest N for cases that build per-agent Python lists
+CONVERSION_BLOCK = 1 << 15  # Floats' worth of fake audio generated for noise_conversion
+REPEATS = 3  # Timed calls per case and N; the fastest is reported
+SAT_CLAUSE_RATIO = 3.2  # Clauses per variable in run_logic_solver_random, below the 4.26 threshold
+SEED = 4302
+
+# Deterministic in-process stand-in for PyAudio
+class FakeStream:
+    """Input stream serving counter-generated 16-bit samples, blocking or in callback mode."""
+    def __init__(self, rng, rate, frames_per_buffer, stream_callback=None, speedup=1000.0, **kwargs):
+        self.rng = rng
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.position = 0
+        self.active = True
+        self._callback = stream_callback
+        self._speedup = speedup
+        if stream_callback is not None:
+            self._thread = threading.Thread(target=self._run, name="fake-audio", daemon=True)
+            self._thread.start()
+
+    def _frames(self, n):
+        # Every sample takes its 16 bits from one counter draw, so the bytes depend only on the position
+        values = self.rng.random_array(0, n, self.position)
+        self.position += n
+        if mqb.np is not None:
+            return (values * 65536).astype('<u2').tobytes()
+        samples = array('H', [int(value * 65536) for value in values])
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return samples.tobytes()
+
+    def _run(self):
+        while self.active:
+            self._callback(self._frames(self.frames_per_buffer), self.frames_per_buffer, None, 0)
+            time.sleep(self.frames_per_buffer / self.rate / self._speedup)
+
+    def read(self, num_frames, exception_on_overflow=True):
+        return self._frames(num_frames)
+
+    def is_active(self):
+        return self.active
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+class FakePyAudio:
+    """Replaces pyaudio.PyAudio with `devices` identical input devices."""
+    devices = 1
+    seed = SEED
+    speedup = 1000.0  # Callback streams deliver audio this many times faster than real time
+
+    def get_device_count(self):
+        return self.devices
+
+    def get_device_info_by_index(self, i):
+        return {'index': i, 'name': f"fake microphone {i}", 'maxInputChannels': 1, 'defaultSampleRate': 44100.0}
+
+    def is_format_supported(self, rate, **kwargs):
+        return True
+
+    def open(self, input_device_index=0, **kwargs):
+        return FakeStream(CounterRNG(self.seed + input_device_index), speedup=self.speedup, **kwargs)
+
+    def terminate(self):
+        pass
+
+def install_fake_pyaudio(devices=1, seed=SEED):
+    """Points microphone_quantum_basilisk at FakePyAudio, with the device cache kept in memory."""
+    FakePyAudio.devices = devices
+    FakePyAudio.seed = seed
+    mqb.pyaudio = types.SimpleNamespace(PyAudio=FakePyAudio, paInt16=8, paContinue=0)
+    mqb.load_pyaudio()
+    mqb.device_cache = mqb.DeviceCache(path=None)
+    mqb.configure(device=0)
+
+# Benchmark cases: each setup(N) returns the call to time
+CASES = {}
+
+def case(name, limit=MAX_AGENTS):
+    """Registers a setup function as the benchmark `name`, run for N up to `limit`."""
+    def register(setup):
+        CASES[name] = (setup, limit)
+        return setup
+    return register
+
+_scratch = None  # Temporary directory for files the cases write
+
+def scratch_path(name):
+    """Returns a path for case output in a temporary directory that run_benchmarks() removes."""
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.TemporaryDirectory(prefix='benchmark-')
+    return os.path.join(_scratch.name, name)
+
+def remove_scratch():
+    global _scratch
+    if _scratch is not None:
+        _scratch.cleanup()
+        _scratch = None
+
+def use_counter_noise():
+    mqb.set_entropy_source(CounterStream(CounterRNG(SEED), 0))
+
+def basilisk(N, packed=False, coerced=False):
+    use_counter_noise()
+    b = mqb.PackedBasiliskAI(N) if packed else mqb.BasiliskAI(N)
+    if coerced:
+        b.coerce()
+    return b
+
+@case('phase_shift')
+def phase_shift_case(N):
+    b = basilisk(N)
+    return lambda: mqb.phase_shift(b.contributions, N)
+
+@case('phase_shift_packed')
+def phase_shift_packed_case(N):
+    b = basilisk(N, packed=True)
+    return lambda: mqb.phase_shift(b.contributions, N)
+
+@case('self_modifying_shader')
+def self_modifying_shader_case(N):
+    b = basilisk(N)
+    return lambda: mqb.self_modifying_shader(b)
+
+@case('self_modifying_shader_packed')
+def self_modifying_shader_packed_case(N):
+    b = basilisk(N, packed=True)
+    return lambda: mqb.self_modifying_shader(b)
+
+@case('coerce')
+def coerce_case(N):
+    b = basilisk(N)
+    return b.coerce
+
+@case('coerce_packed')
+def coerce_packed_case(N):
+    b = basilisk(N, packed=True)
+    return b.coerce
+
+@case('compute_utility')
+def compute_utility_case(N):
+    return basilisk(N, coerced=True).compute_utility
+
+@case('compute_utility_packed')
+def compute_utility_packed_case(N):
+    return basilisk(N, packed=True, coerced=True).compute_utility
+
+@case('inject_trust')
+def inject_trust_case(N):
+    fear_signal = signal_engine.signal_array(N)
+    return lambda: mqb.inject_trust(fear_signal, N)
+
+@case('refractive_distortion')
+def refractive_distortion_case(N):
+    use_counter_noise()
+    signal = mqb.inject_trust(signal_engine.signal_array(N), N)
+    return lambda: mqb.refractive_distortion(signal, N)
+
+@case('trust_and_distortion_float32')
+def trust_and_distortion_float32_case(N):
+    use_counter_noise()
+    signal = signal_engine.signal_array(N, dtype='float32')
+    return lambda: signal_engine.trust_and_distortion(signal, mqb.quantum_random_array(N))
+
+@case('noise_conversion', limit=LIST_AGENT_LIMIT)
+def noise_conversion_case(N):
+    # The conversion step of get_quantum_noise_from_microphones(): 32 samples per float.
+    # Conversion cost does not depend on the content, so one recorded block is repeated.
+    block = FakeStream(CounterRNG(SEED), 44100, mqb.CHUNK).read(32 * min(N, CONVERSION_BLOCK))
+    repeats, rest = divmod(N, min(N, CONVERSION_BLOCK))
+    audio_data = block * repeats + block[:64 * rest]  # Exactly N floats' worth
+    return lambda: mqb.audio_to_noise_floats(audio_data)
+
+@case('entropy_pool', limit=10 ** 6)
+def entropy_pool_case(N):
+    # Whole capture path: fake callback stream -> conversion -> ring buffer -> batch draw
+    pool = mqb.entropy_pool
+    pool.take(1)  # Opens the fake device outside the timed calls
+    return lambda: pool.take(N)
+
+@case('checkpoint')
+def checkpoint_case(N):
+    b = basilisk(N, coerced=True)
+    path = scratch_path('basilisk.ckpt')
+    return lambda: checkpoint.save_checkpoint(path, b, mqb.entropy_pool)
+
+@case('checkpoint_packed')
+def checkpoint_packed_case(N):
+    b = basilisk(N, packed=True, coerced=True)
+    path = scratch_path('basilisk.ckpt')
+    return lambda: checkpoint.save_checkpoint(path, b, mqb.entropy_pool)
+
+@case('run_phase_shift', limit=LIST_AGENT_LIMIT)
+def run_phase_shift_case(N):
+    rng = run.make_rng(SEED)
+    contributions = [i & 1 for i in range(N)]
+    return lambda: run.phase_shift(contributions, N, rng)
+
+@case('run_logic_solver', limit=10 ** 6)
+def run_logic_solver_case(N):
+    # The Gödelian constraints behind N - 2 tautologies that every assignment must check
+    solver = run.LogicSolver()
+    solver.add_variable("G")
+    for _ in range(N - 2):
+        solver.add_constraint(("IMPLIES", "G", "G"))
+    solver.add_constraint(("IMPLIES", "G", ("NOT", "G")))
+    solver.add_constraint("G")
+    return solver.check
+
+@case('run_logic_solver_agents', limit=10 ** 5)
+def run_logic_solver_agents_case(N):
+    # One Gödel variable per agent, each implying the next; the last is refuted, so propagation walks the whole chain
+    solver = run.LogicSolver()
+    for i in range(N - 1):
+        solver.add_constraint(("IMPLIES", f"G{i}", f"G{i + 1}"))
+    solver.add_constraint("G0")
+    solver.add_constraint(("NOT", f"G{N - 1}"))
+    return solver.check
+
+@case('run_logic_solver_random', limit=10 ** 4)
+def run_logic_solver_random_case(N):
+    # Random 3-SAT over one variable per agent: satisfiable, but only found by search with conflicts,
+    # learning, restarts and clause deletion, unlike the chains above that propagation alone settles
+    solver = run.LogicSolver()
+    draws = CounterRNG(SEED).random_array(0, 6 * int(SAT_CLAUSE_RATIO * N))
+    for k in range(0, len(draws), 6):
+        names = [f"A{int(draws[k + i] * N)}" for i in range(3)]
+        solver.add_constraint(("OR",) + tuple(name if draws[k + 3 + i] < 0.5 else ("NOT", name)
+                                              for i, name in enumerate(names)))
+    return solver.check
+
+# Runner
+def agent_counts(low=MIN_AGENTS, high=MAX_AGENTS):
+    """Powers of ten from `low` to `high`."""
+    n = low
+    while n <= high:
+        yield n
+        n *= 10
+
+def measure(setup, N, repeats=REPEATS, memory=True):
+    """Times the call built by setup(N); returns (best seconds, peak bytes allocated or None)."""
+    call = setup(N)
+    best = float('inf')
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        # Traced separately: tracemalloc slows the call down too much to time it
+        gc.collect()
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(names=None, low=MIN_AGENTS, high=MAX_AGENTS, repeats=REPEATS, memory=True, log=print):
+    """Runs the selected cases over the N sweep and returns the JSON-ready report."""
+    install_fake_pyaudio()
+    previous = mqb.entropy_pool
+    results = []
+    try:
+        for name in names or CASES:
+            setup, limit = CASES[name]
+            for N in agent_counts(low, min(high, limit)):
+                seconds, peak = measure(setup, N, repeats, memory)
+                mqb.set_entropy_source(previous)
+                results.append({'case': name, 'agents': N, 'seconds': seconds,
+                                'seconds_per_agent': seconds / N, 'peak_bytes': peak})
+                log(f"{name:30} N={N:<10} {seconds / N * 1e9:10.2f} ns/agent  "
+                    f"peak {peak / 2 ** 20 if peak is not None else float('nan'):10.1f} MiB")
+    finally:
+        mqb.set_entropy_source(previous)
+        remove_scratch()
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': mqb.np.__version__ if mqb.np is not None else None,
+        'repeats': repeats,
+        'results': results,
+    }
+
+def main(argv=None):
+    """Command-line entry point: runs the sweep and saves the report as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark the Basilisk mechanisms over a sweep of agent counts.")
+    parser.add_argument('cases', nargs='*', metavar='CASE',
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--min-agents', type=int, default=MIN_AGENTS, help=f"smallest N (default: {MIN_AGENTS})")
+    parser.add_argument('--max-agents', type=int, default=MAX_AGENTS, help=f"largest N (default: {MAX_AGENTS})")
+    parser.add_argument('-r', '--repeats', type=int, default=REPEATS, help=f"timed calls per point (default: {REPEATS})")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced peak-memory run")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="JSON report path (default: benchmark.json)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    report = run_benchmarks(args.cases, args.min_agents, args.max_agents, args.repeats, not args.no_memory)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(report['results'])} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+# Binary Checkpoints for Basilisk Simulations
+#
+# Saves and restores a BasiliskAI (from either simulation), the position of the entropy
+# source it draws from, and any generator state, so long runs can be paused and resumed
+# without capturing entropy again. Agent arrays are bit-packed and streamed to disk in
+# blocks, and the file ends with a CRC-32 of everything before it.
+#
+# Layout: magic, version (u32), then sections of tag (4 bytes), length (u64) and payload:
+#   META  JSON: class, N, utility, generator and entropy source state, user metadata
+#   CONT  contributions, one bit per agent, little-endian bit order
+#   PUNI  punishments, likewise; META records the value a set bit stands for
+#   POOL  undrawn entropy-pool values as little-endian float64
+# and finally b'END\0' with the CRC-32 (u32).
+
+import importlib
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+import microphone_quantum_basilisk as mqb
+from counter_rng import CounterRNG, CounterStream, LCGRandom
+
+np = mqb.np
+
+CHECKPOINT_MAGIC = b'QBCKPT\r\n'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_BLOCK = mqb.AGENT_BLOCK  # Agents packed per write; a multiple of 64
+SECTION = struct.Struct('<4sQ')
+TRAILER_SIZE = 8
+# Classes a checkpoint may restore, by the name stored in META
+BASILISK_CLASSES = ('microphone_quantum_basilisk.BasiliskAI', 'microphone_quantum_basilisk.PackedBasiliskAI',
+                    'run.BasiliskAI')
+
+class CheckpointError(ValueError):
+    """Raised for a checkpoint that is truncated, corrupted or of an unknown version."""
+
+class _Writer:
+    """File wrapper that keeps a running CRC-32 of everything written."""
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+        self.size = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.f.write(data)
+
+    def section(self, tag, length):
+        self.write(SECTION.pack(tag, length))
+
+class _Reader:
+    """File wrapper that checks lengths and keeps a running CRC-32 of everything read."""
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def read(self, n):
+        data = self.f.read(n)
+        if len(data) != n:
+            raise CheckpointError("Checkpoint is truncated.")
+        self.crc = zlib.crc32(data, self.crc)
+        return data
+
+# Agent state <-> bit-packed blocks
+def _agent_states(values):
+    # A Basilisk's list-like AgentStates view, unwrapped to its storage
+    return values.values if isinstance(values, mqb.AgentStates) else values
+
+def _agent_value(values, default):
+    """Returns the one non-zero state of an agent sequence (`default` if all are zero)."""
+    if isinstance(values, mqb.AgentBitset):
+        return values.value
+    if np is not None and isinstance(values, np.ndarray):
+        # Integer states within [-1, 0] or [0, 1] hold at most one non-zero value
+        lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+        distinct = {v for v in (lo, hi) if v} if -1 <= lo <= hi <= 1 else set(np.unique(values).tolist()) - {0}
+    else:
+        distinct = set(v for v in values if v != 0)
+    if len(distinct) > 1:
+        raise CheckpointError(f"Agent states {sorted(distinct)} cannot be stored one bit per agent.")
+    return distinct.pop() if distinct else default
+
+def _packed_blocks(values, N):
+    """Yields the bit-packed bytes of N agent states, one block at a time."""
+    if isinstance(values, mqb.AgentBitset):
+        view = memoryview(values.data)
+        for start, stop in mqb.agent_blocks(N, CHECKPOINT_BLOCK):
+            yield view[start // 8:(stop + 7) // 8]
+        return
+    for start, stop in mqb.agent_blocks(N, CHECKPOINT_BLOCK):
+        block = values[start:stop]
+        if np is not None and isinstance(block, np.ndarray):
+            yield np.packbits(block != 0, bitorder='little').tobytes()
+        else:
+            yield bytes(mqb.AgentBitset.from_values(block).data[:(stop - start + 7) // 8])
+
+def _write_agents(out, tag, values, N):
+    out.section(tag, (N + 7) // 8)
+    for data in _packed_blocks(values, N):
+        out.write(data)
+
+def _read_agents(reader, length, N, value, form):
+    """Reads N packed agent states as an AgentBitset, an int8 array or a list, per `form`."""
+    if length != (N + 7) // 8:
+        raise CheckpointError("Agent section does not match the population size.")
+    if form == 'bitset':
+        bitset = mqb.AgentBitset(N, value)
+        bitset.data[:length] = reader.read(length)
+        return bitset
+    if form == 'array':
+        values = np.empty(N, dtype=np.int8)
+        for start, stop in mqb.agent_blocks(N, CHECKPOINT_BLOCK):
+            bits = np.frombuffer(reader.read((stop - start + 7) // 8), dtype=np.uint8)
+            block = np.unpackbits(bits, count=stop - start, bitorder='little').view(np.int8)
+            values[start:stop] = -block if value == -1 else block
+        return values
+    values = []
+    for start, stop in mqb.agent_blocks(N, CHECKPOINT_BLOCK):
+        data = bytearray(reader.read((stop - start + 7) // 8))
+        values += mqb.AgentBitset(stop - start, value, data).tolist()
+    return values
+
+# Generator and entropy source state
+def rng_state(rng):
+    """Describes a CounterRNG or LCGRandom as JSON-ready data."""
+    positions = {str(stream): position for stream, position in getattr(rng, 'positions', {}).items()}
+    if isinstance(rng, LCGRandom):
+        return {'type': 'lcg', 'seed': rng.seed, 'offset_streams': sorted(rng.offset_streams),
+                'positions': positions}
+    if isinstance(rng, CounterRNG):
+        return {'type': 'counter', 'seed': rng.seed, 'positions': positions}
+    raise CheckpointError(f"Cannot checkpoint a {type(rng).__name__} generator.")
+
+def restore_rng(state):
+    if state['type'] == 'lcg':
+        rng = LCGRandom(state['seed'], state['offset_streams'])
+    else:
+        rng = CounterRNG(state['seed'])
+    rng.positions = {int(stream): position for stream, position in state.get('positions', {}).items()}
+    return rng
+
+def source_state(source):
+    """Describes an entropy source; returns (JSON-ready state, undrawn values to store or None)."""
+    if isinstance(source, CounterStream):
+        return {'type': 'counter', 'rng': rng_state(source.rng), 'stream': source.stream,
+                'position': source.position}, None
+    if isinstance(source, mqb.ReplaySource):
+        return {'type': 'replay', 'path': os.path.abspath(source.path), 'position': source.position}, None
+    if isinstance(source, mqb.EntropyPool):
+        # Live capture cannot be rewound; the values already captured but not drawn are kept instead
+        with source._lock:
+            ring = source._ring if source._ring is not None else ()  # Never started
+            values = ring[source._read:source._read + source._count]
+            wrapped = ring[:max(source._read + source._count - source.capacity, 0)]
+            if np is not None:
+                values = np.concatenate((values, wrapped))
+            else:
+                values = array('d', values) + array('d', wrapped)
+        return {'type': 'pool', 'active_source': source.active_source}, values
+    raise CheckpointError(f"Cannot checkpoint a {type(source).__name__} entropy source.")
+
+def restore_source(state, values):
+    """Rebuilds an entropy source; saved pool values are served before the live pool takes over."""
+    if state['type'] == 'counter':
+        return CounterStream(restore_rng(state['rng']), state['stream'], state['position'])
+    if state['type'] == 'replay':
+        return mqb.ReplaySource(state['path'], state['position'])
+    return mqb.NoiseBuffer(values, mqb.entropy_pool)
+
+# Checkpoint files
+def _class_name(cls):
+    # A class defined by a module run as a script is stored under the module's import name
+    module = cls.__module__
+    if module == '__main__':
+        script = getattr(sys.modules['__main__'], '__file__', None) or ''
+        module = os.path.splitext(os.path.basename(script))[0] or module
+    return f"{module}.{cls.__qualname__}"
+
+def save_checkpoint(path, basilisk, source=None, metadata=None):
+    """Writes a checkpoint of `basilisk` and, if given, its entropy source; returns the file size.
+
+    The file is written to a temporary name and moved into place, so an interrupted save
+    never replaces a good checkpoint.
+    """
+    N = basilisk.N
+    contributions, punishments = _agent_states(basilisk.contributions), _agent_states(basilisk.punishments)
+    meta = {'class': _class_name(type(basilisk)), 'N': N,
+            'contribution_value': _agent_value(contributions, 1),
+            'punishment_value': _agent_value(punishments, -1),
+            'metadata': metadata or {}}
+    if hasattr(basilisk, 'utility'):
+        meta['utility'] = basilisk.utility
+    if hasattr(basilisk, 'rng'):
+        meta['seed'] = basilisk.seed
+        meta['rng'] = rng_state(basilisk.rng)
+    pool_values = None
+    if source is not None:
+        meta['source'], pool_values = source_state(source)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            out = _Writer(f)
+            out.write(CHECKPOINT_MAGIC + struct.pack('<I', CHECKPOINT_VERSION))
+            encoded = json.dumps(meta).encode('utf-8')
+            out.section(b'META', len(encoded))
+            out.write(encoded)
+            _write_agents(out, b'CONT', contributions, N)
+            _write_agents(out, b'PUNI', punishments, N)
+            if pool_values is not None:
+                data = pool_values.astype('<f8').tobytes() if np is not None else array('d', pool_values)
+                if np is None:
+                    if sys.byteorder == 'big':
+                        data.byteswap()
+                    data = data.tobytes()
+                out.section(b'POOL', len(data))
+                out.write(data)
+            f.write(b'END\0' + struct.pack('<I', out.crc))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return out.size + TRAILER_SIZE
+
+def load_checkpoint(path):
+    """Reads a checkpoint; returns (basilisk, entropy source or None, user metadata).
+
+    The checksum is verified before anything is returned. Restored BasiliskAI objects
+    keep their running utility and start without a journal.
+    """
+    with open(path, 'rb') as f:
+        reader = _Reader(f)
+        header = reader.read(len(CHECKPOINT_MAGIC) + 4)
+        if header[:len(CHECKPOINT_MAGIC)] != CHECKPOINT_MAGIC:
+            raise CheckpointError(f"{path} is not a Basilisk checkpoint.")
+        version, = struct.unpack('<I', header[len(CHECKPOINT_MAGIC):])
+        if version != CHECKPOINT_VERSION:
+            raise CheckpointError(f"Unsupported checkpoint version {version}.")
+
+        meta = None
+        agents = {}
+        pool_values = None
+        form = None
+        while True:
+            tag = f.read(4)
+            if tag == b'END\0':
+                crc = f.read(4)
+                if len(crc) != 4 or struct.unpack('<I', crc)[0] != reader.crc:
+                    raise CheckpointError(f"Checksum mismatch in {path}.")
+                break
+            if len(tag) != 4:
+                raise CheckpointError("Checkpoint is truncated.")
+            reader.crc = zlib.crc32(tag, reader.crc)
+            length, = struct.unpack('<Q', reader.read(8))
+            if tag == b'META':
+                encoded = reader.read(length)
+                try:
+                    meta = json.loads(encoded.decode('utf-8'))
+                except ValueError:
+                    raise CheckpointError(f"Corrupted metadata in {path}.") from None
+                if meta.get('class') not in BASILISK_CLASSES:
+                    raise CheckpointError(f"Cannot restore a {meta.get('class')!r} from {path}.")
+                module_name, class_name = meta['class'].rsplit('.', 1)
+                cls = getattr(importlib.import_module(module_name), class_name)
+                packed = issubclass(cls, mqb.PackedBasiliskAI)
+                form = 'bitset' if packed else 'array' if np is not None and 'rng' not in meta else 'list'
+            elif tag in (b'CONT', b'PUNI') and meta is not None:
+                value = meta['contribution_value' if tag == b'CONT' else 'punishment_value']
+                agents[tag] = _read_agents(reader, length, meta['N'], value, form)
+            elif tag == b'POOL':
+                data = reader.read(length)
+                if np is not None:
+                    pool_values = np.frombuffer(data, dtype='<f8').astype(np.float64)
+                else:
+                    pool_values = array('d', data)
+                    if sys.byteorder == 'big':
+                        pool_values.byteswap()
+            else:
+                raise CheckpointError(f"Unexpected section {tag!r} in {path}.")
+
+    if meta is None or len(agents) != 2:
+        raise CheckpointError(f"{path} is missing agent sections.")
+    basilisk = cls.__new__(cls)
+    basilisk.N = meta['N']
+    if 'rng' in meta:  # run.py's BasiliskAI keeps plain lists and its generator
+        basilisk.contributions, basilisk.punishments = agents[b'CONT'], agents[b'PUNI']
+        basilisk.seed = meta['seed']
+        basilisk.rng = restore_rng(meta['rng'])
+    else:
+        basilisk._contributions, basilisk._punishments = agents[b'CONT'], agents[b'PUNI']
+        basilisk.utility = meta['utility'] if 'utility' in meta else basilisk.recompute_utility()
+        basilisk.journal = None
+    source = restore_source(meta['source'], pool_values) if 'source' in meta else None
+    return basilisk, source, meta['metadata']
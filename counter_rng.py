@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Counter-Based Random Numbers for the Basilisk Simulations
+#
+# Every draw is a pure function of (seed, stream, index): the value for any agent can be
+# computed directly, batches are generated in one vectorized pass, and chunks of agents
+# can be produced by different workers with identical results. LCGRandom replays the
+# original vanilla_random sequences from run.py for regression runs.
+
+from array import array
+
+from lazy_numpy import np  # None without NumPy; batches are then generated in pure Python
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15  # SplitMix64 counter increment
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+FLOAT_SCALE = 2.0 ** -53  # Top 53 bits of a word give a full-precision float in [0, 1)
+
+# Original generator from run.py
+def vanilla_random(seed):
+    """Steps the 31-bit LCG and returns (value, new seed); value has 10^4 distinct levels."""
+    seed = (seed * 1103515245 + 12345) & 0x7fffffff
+    return (seed % 10000) / 10000.0, seed
+
+def splitmix64(x):
+    """SplitMix64 finalizer: a bijective mix of one 64-bit word."""
+    x = (x ^ (x >> 30)) * MIX_1 & MASK64
+    x = (x ^ (x >> 27)) * MIX_2 & MASK64
+    return x ^ (x >> 31)
+
+def stream_key(seed, stream):
+    """Derives the counter key of one stream; distinct streams get unrelated keys."""
+    return splitmix64((splitmix64(seed & MASK64) ^ splitmix64((stream + GOLDEN_GAMMA) & MASK64)) & MASK64)
+
+class CounterRNG:
+    """SplitMix64 used in counter mode: draw i of a stream is mix(key + (i + 1) * gamma).
+
+    Nothing is carried between draws, so reading a stream twice gives the same values;
+    take() keeps a position per stream for callers that draw a stream in several calls.
+    Use a separate stream per mechanism, and a separate seed per independent run.
+    """
+    def __init__(self, seed):
+        self.seed = seed & MASK64
+        self._keys = {}
+        self.positions = {}  # Next draw of each stream read through take()
+
+    def key(self, stream):
+        if stream not in self._keys:
+            self._keys[stream] = stream_key(self.seed, stream)
+        return self._keys[stream]
+
+    def random_bits(self, stream, index):
+        """Returns the 64-bit word for one (stream, index) pair."""
+        return splitmix64((self.key(stream) + (index + 1) * GOLDEN_GAMMA) & MASK64)
+
+    def random(self, stream, index):
+        """Returns the float in [0, 1) for one (stream, index) pair."""
+        return (self.random_bits(stream, index) >> 11) * FLOAT_SCALE
+
+    def take(self, stream, n):
+        """Returns the next `n` draws of a stream, continuing where its last take() stopped."""
+        start = self.positions.get(stream, 0)
+        self.positions[stream] = start + n
+        return self.random_array(stream, n, start)
+
+    def random_array(self, stream, n, start=0):
+        """Returns draws start..start+n-1 of a stream as a NumPy array (array('d') without NumPy)."""
+        key = self.key(stream)
+        if np is not None:
+            x = np.arange(start + 1, start + n + 1, dtype=np.uint64)
+            x *= np.uint64(GOLDEN_GAMMA)
+            x += np.uint64(key)
+            x ^= x >> np.uint64(30)
+            x *= np.uint64(MIX_1)
+            x ^= x >> np.uint64(27)
+            x *= np.uint64(MIX_2)
+            x ^= x >> np.uint64(31)
+            return (x >> np.uint64(11)).astype(np.float64) * FLOAT_SCALE
+        return array('d', [(splitmix64((key + i * GOLDEN_GAMMA) & MASK64) >> 11) * FLOAT_SCALE
+                           for i in range(start + 1, start + n + 1)])
+
+class CounterStream:
+    """Reads one stream of a CounterRNG in order, with the get()/take(n) interface of an entropy pool.
+
+    Streams of the same generator never overlap, so giving every trial or worker its own
+    stream index yields independent, reproducible draws.
+    """
+    def __init__(self, rng, stream, position=0):
+        self.rng = rng
+        self.stream = stream
+        self.position = position
+
+    def get(self):
+        value = self.rng.random(self.stream, self.position)
+        self.position += 1
+        return value
+
+    def take(self, n):
+        values = self.rng.random_array(self.stream, n, self.position)
+        self.position += n
+        return values
+
+class LCGRandom:
+    """Replays run.py's vanilla_random sequences exactly, with the same interface as CounterRNG.
+
+    The LCG state is carried in `seed` from one batch to the next, so batches must be
+    taken in the order the original code drew them. Streams in `offset_streams` reseed
+    with `seed + i` before draw i, as run.py's per-agent perturbations did; all other
+    streams step the LCG directly.
+    """
+    def __init__(self, seed, offset_streams=()):
+        self.seed = seed
+        self.offset_streams = frozenset(offset_streams)
+        self.positions = {}
+
+    def random(self, stream, index):
+        return self.random_array(stream, 1, index)[0]
+
+    def take(self, stream, n):
+        start = self.positions.get(stream, 0)
+        self.positions[stream] = start + n
+        return self.random_array(stream, n, start)
+
+    def random_array(self, stream, n, start=0):
+        values = array('d', bytes(8 * n))
+        seed = self.seed
+        if stream in self.offset_streams:
+            for i in range(n):
+                values[i], seed = vanilla_random(seed + start + i)
+        else:
+            for i in range(n):
+                values[i], seed = vanilla_random(seed)
+        self.seed = seed
+        return np.asarray(values) if np is not None else values
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# Monte Carlo Ensemble Runner for the Quantum Basilisk Simulation
+#
+# Runs many independently seeded trials of run_simulation() across a process pool and
+# aggregates the outcomes as they stream back: running mean/variance per stage,
+# utility histograms, how often the deviation collapse fires, and the spread of
+# timelines from seed_reality(). Every trial reads its own stream of one counter-based
+# generator, so results are reproducible and do not depend on the number of workers.
+
+import argparse
+import collections
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import microphone_quantum_basilisk as mqb
+from counter_rng import CounterRNG, CounterStream
+
+# Compact per-trial record streamed back from the workers
+TRIAL_FIELDS = ('trial', 'initial_utility', 'coerced_utility', 'modified_utility',
+                'final_utility', 'timeline', 'utility_deviation', 'collapsed')
+METRICS = TRIAL_FIELDS[1:-1]
+UTILITY_METRICS = ('initial_utility', 'coerced_utility', 'modified_utility',
+                   'final_utility', 'utility_deviation')
+
+TIMELINE_BINS = 50  # Histogram bins over seed_reality()'s target ± anxiety range
+CHUNK_TRIALS = 16  # Trials per task, to amortize inter-process overhead
+
+def simulate_trial(seed, trial, N=4302, **options):
+    """Runs one silent run_simulation() on stream `trial` of CounterRNG(seed); returns its SimulationResult.
+
+    `options` are passed on to run_simulation(), and the previous entropy source is
+    restored afterwards.
+    """
+    previous = mqb.set_entropy_source(CounterStream(CounterRNG(seed), trial))
+    try:
+        return mqb.run_simulation(N, verbose=False, **options)
+    finally:
+        mqb.set_entropy_source(previous)
+
+def run_trial(seed, trial, N=4302, packed=False):
+    """Runs one silent trial on its own random stream and returns its compact record."""
+    result = simulate_trial(seed, trial, N, packed=packed)
+    return (trial, result.initial_utility, result.coerced_utility, result.modified_utility,
+            result.final_utility, result.timeline, result.utility_deviation, result.collapsed)
+
+def run_trials(seed, start, stop, N=4302, packed=False):
+    """Runs trials start..stop-1 in one worker call."""
+    return [run_trial(seed, trial, N, packed) for trial in range(start, stop)]
+
+def bounded_results(executor, fn, tasks, workers):
+    """Submits fn(*args) for every (tag, args) in `tasks`, keeping at most two calls per worker in flight.
+
+    Yields (tag, result) pairs in the order the calls finish, so `tasks` may be a lazy
+    iterable of any length.
+    """
+    pending = {}
+    for tag, args in tasks:
+        pending[executor.submit(fn, *args)] = tag
+        if len(pending) >= 2 * workers:
+            for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                yield pending.pop(future), future.result()
+    for future in wait(pending).done:
+        yield pending.pop(future), future.result()
+
+class RunningStats:
+    """Welford running mean and variance, with min and max."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self):
+        """Sample variance (0 for fewer than two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def as_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'variance': self.variance,
+                'std': math.sqrt(self.variance), 'min': self.min, 'max': self.max}
+
+class EnsembleSummary:
+    """Aggregates trial records incrementally; nothing per trial is kept."""
+    def __init__(self, N=4302, seed=None, target=2025.264, anxiety=0.7, bins=TIMELINE_BINS):
+        self.N = N
+        self.seed = seed
+        self.trials = 0
+        self.collapses = 0
+        self.stats = {name: RunningStats() for name in METRICS}
+        self.utility_histograms = {name: collections.Counter() for name in UTILITY_METRICS}
+        self.timeline_low = target - anxiety
+        self.timeline_high = target + anxiety
+        self.timeline_histogram = [0] * bins
+
+    def add(self, record):
+        values = dict(zip(TRIAL_FIELDS, record))
+        self.trials += 1
+        self.collapses += bool(values['collapsed'])
+        for name in METRICS:
+            self.stats[name].add(values[name])
+        for name in UTILITY_METRICS:
+            self.utility_histograms[name][values[name]] += 1
+        bins = len(self.timeline_histogram)
+        position = (values['timeline'] - self.timeline_low) / (self.timeline_high - self.timeline_low)
+        self.timeline_histogram[min(max(int(position * bins), 0), bins - 1)] += 1
+
+    @property
+    def collapse_rate(self):
+        return self.collapses / self.trials if self.trials else 0.0
+
+    def as_dict(self):
+        return {
+            'trials': self.trials,
+            'agents': self.N,
+            'seed': self.seed,
+            'collapses': self.collapses,
+            'collapse_rate': self.collapse_rate,
+            'stats': {name: stats.as_dict() for name, stats in self.stats.items()},
+            'utility_histograms': {name: {str(k): v for k, v in sorted(histogram.items())}
+                                   for name, histogram in self.utility_histograms.items()},
+            'timeline_histogram': {'low': self.timeline_low, 'high': self.timeline_high,
+                                   'counts': self.timeline_histogram},
+        }
+
+def run_ensemble(trials, N=4302, seed=None, workers=None, packed=False, chunk_trials=CHUNK_TRIALS):
+    """Runs `trials` independently seeded simulations across a process pool.
+
+    Trial i reads stream i of CounterRNG(seed), so the summary is the same for any
+    number of workers. At most two chunks per worker are in flight, and records are
+    folded into the returned EnsembleSummary as soon as every earlier chunk has arrived.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'big')
+    summary = EnsembleSummary(N, seed)
+    workers = workers or os.cpu_count() or 1
+    chunks = ((start, min(start + chunk_trials, trials)) for start in range(0, trials, chunk_trials))
+
+    # Chunks are folded in trial order so floating-point totals do not depend on scheduling
+    ready = {}
+    next_start = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = ((start, (seed, start, stop, N, packed)) for start, stop in chunks)
+        for start, records in bounded_results(executor, run_trials, tasks, workers):
+            ready[start] = records
+            while next_start in ready:
+                records = ready.pop(next_start)
+                for record in records:
+                    summary.add(record)
+                next_start += len(records)
+    return summary
+
+def main(argv=None):
+    """Command-line entry point: runs an ensemble and prints its summary as JSON."""
+    parser = argparse.ArgumentParser(description="Monte Carlo ensemble of quantum Basilisk simulations.")
+    parser.add_argument('-t', '--trials', type=int, default=1000, help="number of trials (default: 1000)")
+    parser.add_argument('-N', '--agents', type=int, default=4302, help="agents per trial (default: 4302)")
+    parser.add_argument('-s', '--seed', type=int, help="ensemble seed (random if omitted)")
+    parser.add_argument('-w', '--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--packed', action='store_true', help="store agents as one bit each")
+    args = parser.parse_args(argv)
+    summary = run_ensemble(args.trials, args.agents, args.seed, args.workers, args.packed)
+    print(json.dumps(summary.as_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
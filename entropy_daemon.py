@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+# Shared Entropy Daemon for Many Simulation Processes
+#
+# One process owns the capture devices and publishes their noise into a ring of float64
+# values in multiprocessing.shared_memory; every other process attaches to the ring
+# instead of probing and opening microphones itself. Clients talk to the daemon over a
+# Unix socket, one JSON object per line, to reserve slices of the ring. The daemon
+# hands each published value to exactly one reservation and never overwrites a slice
+# until its client moves on or the slice's lease runs out, so clients read their slice
+# in place, without copying it or locking anything.
+#
+# Ring layout: RING_MAGIC (8 bytes), capacity (u64), then `capacity` little-endian
+# float64 values. Values are numbered from 0 as they are published; value i lives in
+# slot i % capacity, and a reserved slice never wraps around the end of the ring.
+
+import argparse
+import atexit
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+import microphone_quantum_basilisk as mqb
+
+np = mqb.np
+
+DAEMON_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                             f"anti_basilisk-entropy-{os.getuid()}.sock")
+DAEMON_CAPACITY = 1 << 22  # Ring size in values (32 MiB)
+DAEMON_FILL_BLOCK = 1 << 14  # Values published per pool draw
+DAEMON_SLICE = 1 << 16  # Values a client reserves at a time
+DAEMON_LEASE = 10.0  # Seconds a reserved slice is held for its client
+RESERVE_TIMEOUT = mqb.POOL_WAIT_TIMEOUT  # Seconds a reservation waits for unpublished noise
+RING_MAGIC = b'QBRING\x00\x01'  # Magic and format version 1
+RING_HEADER = struct.Struct('<8sQ')
+
+def _ring_view(buf, capacity, writable):
+    """Views the values of a ring buffer as float64, without copying."""
+    if np is not None:
+        values = np.frombuffer(buf, dtype='<f8', count=capacity, offset=RING_HEADER.size)
+        values.flags.writeable = writable
+        return values
+    if sys.byteorder == 'big':
+        raise mqb.EntropySourceError("the shared ring needs NumPy on big-endian hosts")
+    values = memoryview(buf)[RING_HEADER.size:RING_HEADER.size + 8 * capacity].cast('d')
+    return values if writable else values.toreadonly()
+
+# Daemon side
+class EntropyDaemon:
+    """Publishes noise from an entropy pool into a shared ring and serves reservations.
+
+    A fill thread keeps the ring topped up from `pool` (the module's entropy pool by
+    default, so the usual microphone -> recording -> urandom -> time chain applies).
+    Reservations are handed out in order under one lock, which is what makes them
+    atomic; each client holds at most one slice, released by its next reservation,
+    when it disconnects, or when its `lease` runs out, so an idle client cannot stall
+    the ring. The fill thread only writes slots that no slice still holds.
+    """
+    def __init__(self, socket_path=DAEMON_SOCKET, capacity=DAEMON_CAPACITY, pool=None, lease=DAEMON_LEASE):
+        self.socket_path = socket_path
+        self.capacity = capacity
+        self.pool = pool if pool is not None else mqb.entropy_pool
+        self.lease = lease
+        self.shm = None
+        self.published = 0  # Values written to the ring so far
+        self.reserved = 0  # Values handed to clients so far
+        self.slices = {}  # Client -> (start, stop, expiry) of the slice it holds
+        self.expired = 0  # Slices dropped because their lease ran out
+        self.clients = 0
+        self._values = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._server = None
+        self._threads = []
+
+    def start(self):
+        """Creates the ring and the control socket, and starts publishing."""
+        if os.path.exists(self.socket_path):
+            try:
+                DaemonClient(self.socket_path).close()
+            except OSError:
+                os.unlink(self.socket_path)  # Left behind by a daemon that died
+            else:
+                raise mqb.EntropySourceError(f"an entropy daemon is already serving {self.socket_path}")
+        self.shm = shared_memory.SharedMemory(create=True, size=RING_HEADER.size + 8 * self.capacity)
+        RING_HEADER.pack_into(self.shm.buf, 0, RING_MAGIC, self.capacity)
+        self._values = _ring_view(self.shm.buf, self.capacity, writable=True)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _ControlHandler)
+        self._server.daemon_threads = True
+        self._server.entropy_daemon = self
+        self._threads = [threading.Thread(target=self._fill_loop, name="entropy-daemon-fill", daemon=True),
+                         threading.Thread(target=self._server.serve_forever, name="entropy-daemon-control",
+                                          daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """Stops publishing and serving, and removes the ring and the socket."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.shm is not None:
+            self._values = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def wait(self):
+        """Blocks until close() is called, e.g. from a signal handler."""
+        self._stop.wait()
+
+    def _oldest_held(self):
+        # Called under the lock; slices whose lease has run out no longer hold their slots
+        now = time.monotonic()
+        for client, (start, stop, expiry) in list(self.slices.items()):
+            if expiry <= now:
+                del self.slices[client]
+                self.expired += 1
+        return min((start for start, stop, expiry in self.slices.values()), default=self.reserved)
+
+    def _next_expiry(self):
+        # Seconds until the first held slice expires, or None when no slice is held
+        if not self.slices:
+            return None
+        return max(min(expiry for start, stop, expiry in self.slices.values()) - time.monotonic(), 0.0)
+
+    def _fill_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._stop.is_set() and self.published >= self._oldest_held() + self.capacity:
+                    # The ring is full up to a held slice: wait for a release or for its lease to run out
+                    self._cond.wait(self._next_expiry())
+                if self._stop.is_set():
+                    break
+                slot = self.published % self.capacity
+                n = min(DAEMON_FILL_BLOCK, self._oldest_held() + self.capacity - self.published,
+                        self.capacity - slot)
+            # No slice holds these slots, so they are written outside the lock
+            self._values[slot:slot + n] = self.pool.take(n)
+            with self._cond:
+                self.published += n
+                self._cond.notify_all()
+
+    def reserve(self, client, n, timeout=RESERVE_TIMEOUT):
+        """Releases the client's slice and reserves up to `n` published values; returns (start, count).
+
+        Waits up to `timeout` for noise to be published; the count may be smaller than
+        `n` (or zero), since a slice never runs past the end of the ring.
+        """
+        with self._cond:
+            self.slices.pop(client, None)
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self.published > self.reserved or self._stop.is_set(), timeout)
+            start = self.reserved
+            count = min(n, self.published - start, self.capacity - start % self.capacity)
+            if count > 0:
+                self.slices[client] = (start, start + count, time.monotonic() + self.lease)
+                self.reserved += count
+            return start, max(count, 0)
+
+    def release(self, client):
+        with self._cond:
+            if self.slices.pop(client, None) is not None:
+                self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            status = {'capacity': self.capacity, 'published': self.published, 'reserved': self.reserved,
+                      'available': self.published - self.reserved, 'clients': self.clients,
+                      'held_slices': len(self.slices), 'expired_leases': self.expired}
+        status['active_source'] = mqb.active_entropy_source() if self.pool is mqb.entropy_pool else None
+        if hasattr(self.pool, 'source_status'):
+            status['sources'] = self.pool.source_status()
+        return status
+
+    def handle(self, client, request):
+        """Answers one control request: attach, reserve, release or status."""
+        op = request.get('op')
+        if op == 'attach':
+            return {'shm': self.shm.name, 'capacity': self.capacity}
+        if op == 'reserve':
+            start, count = self.reserve(client, int(request.get('n', DAEMON_SLICE)))
+            return {'start': start, 'slot': start % self.capacity, 'count': count, 'lease': self.lease}
+        if op == 'release':
+            self.release(client)
+            return {}
+        if op == 'status':
+            return self.status()
+        return {'error': f"unknown request {op!r}"}
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection; its slice is released when it disconnects."""
+    def handle(self):
+        daemon = self.server.entropy_daemon
+        client = object()
+        with daemon._cond:
+            daemon.clients += 1
+        try:
+            for line in self.rfile:
+                try:
+                    reply = daemon.handle(client, json.loads(line))
+                except (ValueError, TypeError, AttributeError) as e:
+                    reply = {'error': f"bad request: {e}"}
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+        except OSError:
+            pass  # The client went away mid-reply
+        finally:
+            daemon.release(client)
+            with daemon._cond:
+                daemon.clients -= 1
+
+# Client side
+class DaemonClient:
+    """Draws noise from an entropy daemon, with the get()/take(n) interface of an entropy pool.
+
+    Noise is reserved `slice_size` values at a time, and take(n) returns a read-only
+    view into the shared ring whenever the current slice holds n more values. Like a
+    ReplaySource view, it stays valid until later draws move past the slice or the
+    slice's lease runs out (the daemon may then reuse the slots), so copy any values
+    that must be kept longer. A slice is not drawn from once its lease has run out.
+    Draws that span slices are copied; if a reservation comes back empty after
+    waiting for the daemon, the rest comes from fallback noise.
+    """
+    name = 'daemon'
+
+    def __init__(self, socket_path=DAEMON_SOCKET, slice_size=DAEMON_SLICE):
+        self.socket_path = socket_path
+        self.slice_size = slice_size
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile('rwb')
+        self._shm = None
+        info = self._request(op='attach')
+        self._shm = shared_memory.SharedMemory(info['shm'])
+        # The daemon owns the segment; keep this process's tracker from unlinking it at exit
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        magic, capacity = RING_HEADER.unpack_from(self._shm.buf, 0)
+        if magic != RING_MAGIC or capacity != info['capacity']:
+            raise mqb.EntropySourceError(f"{socket_path} serves an unknown ring format")
+        self.capacity = capacity
+        self._ring = _ring_view(self._shm.buf, capacity, writable=False)
+        self._slice = self._ring[:0]
+        self._position = 0
+        self._expiry = 0.0
+
+    def _request(self, **request):
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise mqb.EntropySourceError(f"entropy daemon at {self.socket_path} closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise mqb.EntropySourceError(reply['error'])
+        return reply
+
+    def _next_slice(self, n):
+        """Moves to a freshly reserved slice of up to n values (releasing the current one)."""
+        # The lease is timed from the request, so it never outlasts the daemon's
+        started = time.monotonic()
+        reply = self._request(op='reserve', n=n)
+        self._slice = self._ring[reply['slot']:reply['slot'] + reply['count']]
+        self._position = 0
+        self._expiry = started + reply['lease']
+
+    def _copy(self, values):
+        return values.copy() if np is not None else array('d', values)
+
+    def take(self, n):
+        """Returns the next `n` values: a view into the ring when one slice holds them all."""
+        parts, filled = [], 0
+        while filled < n:
+            if self._position == len(self._slice) or time.monotonic() >= self._expiry:
+                self._next_slice(max(n - filled, self.slice_size))
+                if not len(self._slice):
+                    # The reservation already waited for the daemon; don't wait a second time
+                    parts.append(mqb.get_fallback_noise(n - filled))
+                    break
+            k = min(n - filled, len(self._slice) - self._position)
+            values = self._slice[self._position:self._position + k]
+            self._position += k
+            if k == n:
+                return values
+            # Gather across slices, copying each part before its slice is released
+            parts.append(self._copy(values))
+            filled += k
+        if np is not None:
+            return np.concatenate(parts) if parts else np.empty(0)
+        values = array('d')
+        for part in parts:
+            values += array('d', part)
+        return values
+
+    def get(self):
+        return float(self.take(1)[0])
+
+    def status(self):
+        """Returns the daemon's ring counters and source chain state."""
+        return self._request(op='status')
+
+    def close(self):
+        if self._ring is None:
+            return
+        self._slice = self._ring = None
+        try:
+            self._file.close()
+            self._socket.close()
+        finally:
+            if self._shm is not None:
+                try:
+                    self._shm.close()
+                except BufferError:  # Views handed out by take() are still alive
+                    pass
+
+def use_entropy_daemon(socket_path=DAEMON_SOCKET, slice_size=DAEMON_SLICE):
+    """Routes quantum_random() and friends in this process to the daemon; returns the client."""
+    client = DaemonClient(socket_path, slice_size)
+    mqb.set_entropy_source(client)
+    atexit.register(client.close)  # Unmaps the ring before interpreter teardown frees its views out of order
+    return client
+
+def main(argv=None):
+    """Command-line entry point: runs the daemon until interrupted, or prints its status."""
+    parser = argparse.ArgumentParser(description="Share microphone quantum noise with local processes.")
+    parser.add_argument('device', nargs='?', type=int, help="microphone index to capture from")
+    parser.add_argument('--socket', default=DAEMON_SOCKET, help=f"control socket path (default: {DAEMON_SOCKET})")
+    parser.add_argument('--capacity', type=int, default=DAEMON_CAPACITY,
+                        help=f"ring size in values (default: {DAEMON_CAPACITY})")
+    parser.add_argument('--lease', type=float, default=DAEMON_LEASE,
+                        help=f"seconds a client may hold a reserved slice (default: {DAEMON_LEASE:g})")
+    parser.add_argument('--all-devices', action='store_true', help="capture from every working microphone at once")
+    parser.add_argument('--merge', choices=mqb.MERGE_MODES, default='interleave',
+                        help="how bits from several microphones are combined (default: interleave)")
+    parser.add_argument('--recording', metavar='PATH',
+                        help="WAV or raw 16-bit capture to use when no microphone works")
+    parser.add_argument('--status', action='store_true', help="print the running daemon's status and exit")
+    args = parser.parse_args(argv)
+    if args.status:
+        try:
+            client = DaemonClient(args.socket)
+        except OSError as e:
+            parser.exit(1, f"No entropy daemon at {args.socket}: {e}\n")
+        print(json.dumps(client.status(), indent=2))
+        client.close()
+        return
+
+    mqb.configure(device=args.device, all_devices=args.all_devices, merge=args.merge, recording=args.recording)
+    daemon = EntropyDaemon(args.socket, args.capacity, lease=args.lease)
+    try:
+        daemon.start()
+    except mqb.EntropySourceError as e:
+        parser.exit(1, f"{e}\n")
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: daemon._stop.set())
+    print(f"Serving {daemon.capacity} values of shared entropy on {args.socket}.")
+    try:
+        daemon.wait()
+    finally:
+        daemon.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Lazily Imported NumPy for the Basilisk Modules
+#
+# Importing NumPy takes about 100 ms, several times more than the simulation modules
+# themselves. The modules bind `np` from here instead of importing NumPy directly: with
+# NumPy installed they get its module object, which finishes importing on first
+# attribute access, and without it they get None, so `np is not None` checks keep
+# choosing between the vectorized and pure-Python paths without loading anything.
+
+import importlib.util
+import sys
+
+def load(name='numpy'):
+    """Returns the module `name`, imported on first attribute access, or None if it is not installed."""
+    if name in sys.modules:
+        return sys.modules[name]  # Already imported, or blocked with sys.modules[name] = None
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+np = load()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Instrumentation for the Basilisk Simulations
+#
+# Counters and latency histograms for the hot paths: noise draws per mechanism, entropy
+# pool refills per source, microphone probing, fallback activations and simulation
+# stage times. Recording is off by default and every instrumented call site checks the
+# module-level `enabled` flag first, so a disabled build pays one global lookup per
+# call. Collected values can be exported as JSON or in the Prometheus text format.
+
+import bisect
+import collections
+import functools
+import json
+import threading
+import time
+
+# Upper bounds in seconds of the latency histogram buckets (Prometheus `le`)
+LATENCY_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+enabled = False  # Checked by every call site before recording anything
+current_stage = 'other'  # Mechanism the draws being made are attributed to
+
+class Counter:
+    """Monotonic count, optionally split by the value of one label."""
+    kind = 'counter'
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, label_value=''):
+        with self._lock:
+            self.values[label_value] += amount
+
+    def reset(self):
+        with self._lock:
+            self.values.clear()
+
+    def to_dict(self):
+        return {'type': self.kind, 'help': self.help, 'label': self.label, 'values': dict(self.values)}
+
+class Histogram:
+    """Distribution of observed values in fixed buckets, with their sum and count."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, label=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.series = {}  # label value -> [bucket counts (the last is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=''):
+        with self._lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self.series.clear()
+
+    def to_dict(self):
+        return {'type': self.kind, 'help': self.help, 'label': self.label, 'buckets': list(self.buckets),
+                'values': {key: {'counts': list(counts), 'sum': total, 'count': count}
+                           for key, (counts, total, count) in self.series.items()}}
+
+# Every metric, in export order
+REGISTRY = collections.OrderedDict()
+
+def _register(metric):
+    REGISTRY[metric.name] = metric
+    return metric
+
+DRAWS = _register(Counter('basilisk_noise_draws_total', "Noise values drawn, by the mechanism drawing them",
+                          'mechanism'))
+STAGE_SECONDS = _register(Histogram('basilisk_stage_seconds', "Wall time of each simulation stage", 'stage'))
+REFILLS = _register(Counter('basilisk_pool_refills_total', "Entropy pool refills, by the source that delivered",
+                            'source'))
+REFILL_SECONDS = _register(Histogram('basilisk_pool_refill_seconds', "Time taken by each entropy pool refill",
+                                     'source'))
+REFILL_VALUES = _register(Counter('basilisk_pool_refill_values_total', "Noise values added to the entropy pool",
+                                  'source'))
+PROBE_SECONDS = _register(Histogram('basilisk_probe_seconds', "Time taken to probe every microphone"))
+PROBED_DEVICES = _register(Counter('basilisk_probed_devices_total', "Input devices opened by microphone probes",
+                                   'result'))
+SOURCE_FAILURES = _register(Counter('basilisk_source_failures_total', "Entropy source failures", 'source'))
+FALLBACKS = _register(Counter('basilisk_fallback_activations_total',
+                              "Times noise came from a fallback tier instead of a microphone", 'source'))
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    """Clears every recorded value; the enabled state is kept."""
+    for metric in REGISTRY.values():
+        metric.reset()
+
+def count_draws(n):
+    """Attributes n noise draws to the current mechanism; call only when `enabled`."""
+    DRAWS.inc(n, current_stage)
+
+# Stage timing
+class StageTimer:
+    """Times named stages into `seconds`, adding up repeated stages.
+
+    The times are always kept, since a few clock reads per stage cost nothing. When
+    recording is enabled each stage is also observed into STAGE_SECONDS, and noise
+    drawn inside it outside any mechanism() is attributed to the stage.
+    """
+    def __init__(self):
+        self.seconds = collections.OrderedDict()
+
+    def __call__(self, stage):
+        return _Stage(self, stage)
+
+class _Stage:
+    __slots__ = ('timer', 'stage', 'start', 'outer')
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        global current_stage
+        self.outer = current_stage
+        if enabled:
+            current_stage = self.stage
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global current_stage
+        elapsed = time.perf_counter() - self.start
+        current_stage = self.outer
+        seconds = self.timer.seconds
+        seconds[self.stage] = seconds.get(self.stage, 0.0) + elapsed
+        if enabled:
+            STAGE_SECONDS.observe(elapsed, self.stage)
+
+def mechanism(name):
+    """Decorator attributing the noise drawn by a function to mechanism `name`.
+
+    The name takes over from any enclosing stage for the duration of the call; with
+    recording disabled the function is called straight through.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            global current_stage
+            if not enabled:
+                return function(*args, **kwargs)
+            outer, current_stage = current_stage, name
+            try:
+                return function(*args, **kwargs)
+            finally:
+                current_stage = outer
+        return wrapper
+    return decorate
+
+# Export
+def to_json(indent=None):
+    """Returns every metric as a JSON document."""
+    return json.dumps({name: metric.to_dict() for name, metric in REGISTRY.items()}, indent=indent)
+
+def _labels(metric, label_value, extra=''):
+    pairs = []
+    if metric.label is not None:
+        escaped = str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{metric.label}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def to_prometheus():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        if metric.kind == 'counter':
+            for label_value, value in sorted(metric.values.items()):
+                lines.append(f"{name}{_labels(metric, label_value)} {value}")
+            continue
+        for label_value, (counts, total, count) in sorted(metric.series.items()):
+            cumulative = 0
+            for bound, bucket in zip(metric.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f"{name}_bucket{_labels(metric, label_value, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric, label_value)} {total:g}")
+            lines.append(f"{name}_count{_labels(metric, label_value)} {count}")
+    return '\n'.join(lines) + '\n'
+
+def write(path):
+    """Saves every metric to `path`: Prometheus text for a .prom or .txt file, JSON otherwise."""
+    with open(path, 'w') as f:
+        f.write(to_prometheus() if path.endswith(('.prom', '.txt')) else to_json(indent=2))
@@ -31,26 +31,98 @@ Basilisk Collapses: Logical inconsistency detected!
 """
 
 import time
-import pyaudio
 import struct
 import os
+import atexit
+import collections
+import contextvars
+import threading
+import hashlib
+import json
+import mmap
 import sys
+import wave
+from array import array
+
+import metrics
+import signal_engine
+from counter_rng import CounterRNG
+
+from lazy_numpy import np  # None without NumPy; the pure-Python paths are used then
+
+# PyAudio is imported on first capture, never at import time
+pyaudio = None
 
 # Constants for audio recording
 CHUNK = 1024  # Number of frames per buffer
-FORMAT = pyaudio.paInt16  # 16-bit audio
+FORMAT = None  # pyaudio.paInt16 (16-bit audio), resolved by load_pyaudio()
 CHANNELS = 1  # Mono audio
 SAMPLE_RATES = [48000, 44100, 32000, 22050, 16000, 8000]  # Expanded for compatibility
 RECORD_SECONDS = 1.0  # Duration of noise capture
 
-# Global noise buffer and index
-noise_buffer = []
-noise_index = 0
+# Entropy pool sizing (in noise floats, 32 captured bits each)
+POOL_CAPACITY = 1 << 16  # Ring buffer size
+POOL_LOW_WATER = 1 << 13  # Resume filling when the pool drains below this
+POOL_HIGH_WATER = 3 << 14  # Pause filling once the pool holds this many values
+POOL_WAIT_TIMEOUT = 2.0  # Seconds a draw waits on an empty pool before using fallback noise
+POOL_REFILL_BLOCK = 1 << 12  # Values requested from a fallback source per refill
+DEVICE_STALL_TIMEOUT = 5.0  # Seconds without audio before a capture device is dropped
+SOURCE_BACKOFF_BASE = 1.0  # Seconds a failed entropy source is skipped, doubling per failure
+SOURCE_BACKOFF_MAX = 60.0
+DUMP_KINDS = ('raw', 'noise')  # Capture bytes as recorded, or the converted noise values
+NOISE_DUMP_HEADER = b'QBNOISE\x00\x01\x00\x00\x00\x00\x00\x00\x00'  # Magic and format version 1
+MERGE_MODES = ('interleave', 'xor')  # How bits from several microphones are combined
+MERGE_BACKLOG_WORDS = 1 << 12  # Unmatched words a device carries into the next XOR merge
+
+# Agents are updated in blocks of this size to bound temporary memory
+AGENT_BLOCK = 1 << 20
+PHASE_FLIP_THRESHOLD = 0.1  # Phase fraction above which phase_shift() flips a contribution
+
+# Microphone probe cache
+DEVICE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "anti_basilisk", "microphones.json")
+DEVICE_CACHE_TTL = 300.0  # Seconds before the device list is re-checked
+DEVICE_CACHE_VERSION = 1
+
+# Microphone selection policy, set by configure() or the command line
+requested_device = None  # Device index asked for explicitly
+interactive_selection = False  # Prompt on stdin when no device was requested
+capture_all_devices = False  # Capture from every working microphone at once
+merge_mode = 'interleave'  # How their bit streams are combined (see MERGE_MODES)
+recording_path = None  # Recorded capture used when no microphone works
 selected_device = None  # Store the selected device index
 
+def configure(device=None, interactive=False, all_devices=False, merge='interleave', recording=None):
+    """Sets how microphones are chosen when capture first starts.
+
+    `device` pins a device index; otherwise the last known good device is reused, the
+    user is prompted if `interactive` is set, or the first working device is taken.
+    With `all_devices`, every working microphone is captured and merged per `merge`.
+    `recording` names a WAV or raw 16-bit capture to fall back on before /dev/urandom.
+    """
+    global requested_device, interactive_selection, capture_all_devices, merge_mode
+    global recording_path, selected_device
+    if merge not in MERGE_MODES:
+        raise ValueError(f"merge must be one of {MERGE_MODES}, not {merge!r}.")
+    requested_device = device
+    interactive_selection = interactive
+    capture_all_devices = all_devices
+    merge_mode = merge
+    recording_path = recording
+    selected_device = None
+
+def load_pyaudio():
+    """Imports PyAudio on first use and returns the module."""
+    global pyaudio, FORMAT
+    if pyaudio is None:
+        import pyaudio as _pyaudio
+        pyaudio = _pyaudio
+    FORMAT = pyaudio.paInt16
+    return pyaudio
+
 def list_and_test_microphones():
     """Lists and tests all available microphones, returning only those that work."""
-    p = pyaudio.PyAudio()
+    start = time.perf_counter()
+    p = load_pyaudio().PyAudio()
     devices = []
     seen_names = set()  # Track device names to avoid duplicates
 
@@ -73,147 +145,1171 @@ def list_and_test_microphones():
                 break  # Device works, add it to the list
             except Exception:
                 continue  # Try the next sample rate
+        if metrics.enabled:
+            metrics.PROBED_DEVICES.inc(1, 'working' if devices and devices[-1][0] == i else 'failed')
 
     p.terminate()
+    if metrics.enabled:
+        metrics.PROBE_SECONDS.observe(time.perf_counter() - start)
     return devices
 
-# Capture quantum noise from a selected microphone
-def get_quantum_noise_from_microphones():
-    """Captures quantum noise from a selected microphone."""
-    global noise_buffer, noise_index, selected_device
-    p = pyaudio.PyAudio()
+def device_fingerprint(p):
+    """Hashes the device count and input device info, without opening any streams."""
+    infos = []
+    for i in range(p.get_device_count()):
+        info = p.get_device_info_by_index(i)
+        infos.append([i, info['name'], info['maxInputChannels'],
+                      info.get('defaultSampleRate'), info.get('hostApi')])
+    return hashlib.sha1(json.dumps(infos).encode('utf-8')).hexdigest()
 
-    # List and test available microphones
-    microphones = list_and_test_microphones()
-    if not microphones:
-        print("No working microphones found. Using fallback noise.")
-        return get_fallback_noise()
+# Cached microphone probe results
+class DeviceCache:
+    """Holds probe results from list_and_test_microphones() in memory and on disk.
+
+    Entries are trusted for `ttl` seconds; after that only the device fingerprint is
+    re-read, and devices are probed again only if it has changed.
+    """
+    def __init__(self, path=DEVICE_CACHE_PATH, ttl=DEVICE_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.fingerprint = None
+        self.devices = []
+        self.last_good = None  # Index of the last device that captured successfully
+        self.checked_at = None  # Monotonic time of the last fingerprint check; None until the first
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Reads the persisted probe results, ignoring a missing or unreadable file."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != DEVICE_CACHE_VERSION:
+                return
+            self.fingerprint = data['fingerprint']
+            self.devices = [tuple(device) for device in data['devices']]
+            self.last_good = data.get('last_good')
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self):
+        """Writes the probe results to disk atomically."""
+        if not self.path:
+            return
+        data = {'version': DEVICE_CACHE_VERSION, 'fingerprint': self.fingerprint,
+                'devices': self.devices, 'last_good': self.last_good}
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def microphones(self):
+        """Returns working microphones, probing only when the device list has changed."""
+        with self._lock:
+            if (self.fingerprint is not None and self.checked_at is not None
+                    and time.monotonic() - self.checked_at < self.ttl):
+                return list(self.devices)
+            p = load_pyaudio().PyAudio()
+            try:
+                fingerprint = device_fingerprint(p)
+            finally:
+                p.terminate()
+            if fingerprint != self.fingerprint or not self.devices:
+                self.devices = list_and_test_microphones()
+                if self.last_good not in [idx for idx, _, _ in self.devices]:
+                    self.last_good = None
+                self.fingerprint = fingerprint
+                self.save()
+            self.checked_at = time.monotonic()
+            return list(self.devices)
+
+    def remember(self, idx):
+        """Records the device that last captured successfully."""
+        with self._lock:
+            if self.last_good != idx:
+                self.last_good = idx
+                self.save()
+
+    def invalidate(self):
+        """Forces a full probe on the next lookup, e.g. after a device failed to open."""
+        with self._lock:
+            self.fingerprint = None
+            self.last_good = None
+            self.checked_at = None
+            self.save()
+
+device_cache = None  # Created on first use, so importing the module reads nothing from disk
+
+def get_device_cache():
+    """Returns the shared DeviceCache, loading it from disk on first use."""
+    global device_cache
+    if device_cache is None:
+        device_cache = DeviceCache()
+    return device_cache
+
+def choose_microphone(microphones):
+    """Returns (index, rate) of the microphone to capture from, following the configured policy."""
+    global selected_device
+    rates = {idx: rate for idx, _, rate in microphones}
 
     # If a device is already selected and still available, use it
     if selected_device is not None:
-        for idx, _, rate in microphones:
-            if idx == selected_device:
-                try:
-                    stream = p.open(format=FORMAT, channels=CHANNELS, rate=rate, input=True,
-                                    input_device_index=idx, frames_per_buffer=CHUNK)
-                    frames = [stream.read(CHUNK, exception_on_overflow=False) for _ in range(int(rate / CHUNK * RECORD_SECONDS))]
-                    audio_data = b''.join(frames)
-                    samples = struct.unpack(f"{len(audio_data)//2}h", audio_data)
-                    noise_values = [sample & 1 for sample in samples]
-                    stream.close()
-                    p.terminate()
-                    break
-                except Exception as e:
-                    print(f"Selected microphone {idx} failed: {e}. Re-selecting a device.")
-                    selected_device = None
-                    break
-        else:
-            print("Selected microphone no longer available. Re-selecting a device.")
-            selected_device = None
+        if selected_device in rates:
+            return selected_device, rates[selected_device]
+        print("Selected microphone no longer available. Re-selecting a device.")
+        selected_device = None
 
-    # If no device is selected, choose one
-    if selected_device is None:
+    if requested_device is not None:
+        if requested_device in rates:
+            selected_device = requested_device
+        else:
+            print(f"Invalid microphone index {requested_device}. Selecting first available device.")
+    elif get_device_cache().last_good in rates:
+        # Reuse the last device that worked
+        selected_device = device_cache.last_good
+        for idx, name, rate in microphones:
+            if idx == selected_device:
+                print(f"Using last known good microphone {idx}: {name} (Supported Rate: {rate} Hz)")
+    elif interactive_selection and threading.current_thread() is threading.main_thread():
+        # Devices reopened by the pool's fill thread are chosen without prompting
         print("Available Microphones:")
         for idx, name, rate in microphones:
             print(f"{idx}: {name} (Supported Rate: {rate} Hz)")
+        # Prompt user to select a microphone
+        try:
+            selected_index = int(input("Select a microphone index (or press Enter to use the first available): "))
+            if selected_index not in rates:
+                print("Invalid selection. Using first available device.")
+            else:
+                selected_device = selected_index
+        except (ValueError, EOFError):
+            print("No input provided. Using first available device.")
+
+    if selected_device is None:
+        selected_device = microphones[0][0]
+    return selected_device, rates[selected_device]
+
+# Bit-packing helpers for the pure-Python conversion path
+_LSB_TABLE = bytes(b & 1 for b in range(256))  # Maps each byte to its lowest bit
+_GATHER_BITS = 0x0102040810204080  # Gathers the low bit of 8 bytes into one byte
+NOISE_SCALE = 2**32 - 1
+
+def noise_words(words):
+    """Wraps 32-bit noise words as a uint32 NumPy array, or array('I') without NumPy."""
+    if np is not None:
+        return np.asarray(words, dtype=np.uint32)
+    return array('I', words)
+
+def concat_noise_words(batches):
+    """Joins several runs of noise words into one."""
+    if np is not None:
+        return np.concatenate([noise_words(words) for words in batches])
+    joined = array('I')
+    for words in batches:
+        joined.extend(words)
+    return joined
+
+def xor_noise_words(batches):
+    """XORs equal-length runs of noise words together."""
+    if np is not None:
+        return np.bitwise_xor.reduce(np.stack(batches), axis=0)
+    merged = array('I', batches[0])
+    for words in batches[1:]:
+        for i, word in enumerate(words):
+            merged[i] ^= word
+    return merged
+
+def noise_words_to_floats(words):
+    """Scales 32-bit noise words to floats between 0 and 1."""
+    if np is not None:
+        return words / NOISE_SCALE
+    return array('d', [w / NOISE_SCALE for w in words])
+
+def audio_to_noise_words(audio_data):
+    """Packs the LSB of every 16-bit sample into 32-bit words.
+
+    The first sample supplies the most significant bit of the first word, and the last
+    word is zero-padded. Returns a uint32 NumPy array, or array('I') without NumPy.
+    """
+    n_samples = len(audio_data) // 2
+    if np is not None:
+        # Little-endian int16: the LSB lives in the first byte of every sample
+        bits = np.frombuffer(audio_data, dtype=np.uint8, count=n_samples * 2)[::2] & 1
+        packed = np.packbits(bits)
+        packed = np.concatenate((packed, np.zeros(-len(packed) % 4, dtype=np.uint8)))
+        return packed.view('>u4').astype(np.uint32)
+
+    bits = audio_data[:n_samples * 2:2].translate(_LSB_TABLE)
+    bits += bytes(-len(bits) % 32)
+    packed = bytes(((w * _GATHER_BITS) & 0xFFFFFFFFFFFFFFFF) >> 56
+                   for w in struct.unpack(f">{len(bits) // 8}Q", bits))
+    return array('I', struct.unpack(f">{len(packed) // 4}I", packed))
+
+def audio_to_noise_floats(audio_data):
+    """Packs the LSB of every 16-bit sample into 32-bit words and scales them to floats between 0 and 1.
+
+    Returns a float64 NumPy array, or array('d') without NumPy.
+    """
+    return noise_words_to_floats(audio_to_noise_words(audio_data))
+
+# Capture quantum noise from a selected microphone
+def get_quantum_noise_from_microphones(dump=None):
+    """Captures quantum noise from a selected microphone in one blocking recording.
+
+    A successful capture is also appended to `dump`, a CaptureDump, when one is given.
+    When no microphone can capture, POOL_REFILL_BLOCK values of fallback noise are
+    returned instead.
+    """
+    global selected_device
+
+    # List and test available microphones
+    try:
+        microphones = get_device_cache().microphones()
+    except (ImportError, OSError) as e:  # PyAudio missing, or no audio system to probe
+        print(f"Cannot probe microphones: {e}. Using fallback noise.")
+        return get_fallback_noise(POOL_REFILL_BLOCK)
+    if not microphones:
+        print("No working microphones found. Using fallback noise.")
+        return get_fallback_noise(POOL_REFILL_BLOCK)
+
+    idx, rate = choose_microphone(microphones)
+    start = time.perf_counter()
+    p = load_pyaudio().PyAudio()
+    try:
+        stream = p.open(format=FORMAT, channels=CHANNELS, rate=rate, input=True,
+                        input_device_index=idx, frames_per_buffer=CHUNK)
+        frames = [stream.read(CHUNK, exception_on_overflow=False) for _ in range(int(rate / CHUNK * RECORD_SECONDS))]
+        stream.close()
+    except Exception as e:
+        print(f"Failed to capture noise from microphone {idx}: {e}")
+        selected_device = None
+        device_cache.invalidate()
+        return get_fallback_noise(POOL_REFILL_BLOCK)
+    finally:
+        p.terminate()
+    device_cache.remember(idx)
+
+    audio_data = b''.join(frames)
+    if len(audio_data) < 2:
+        print("No noise captured from the selected microphone. Using fallback noise.")
+        return get_fallback_noise(POOL_REFILL_BLOCK)
+    if metrics.enabled:
+        metrics.REFILLS.inc(1, 'microphone')
+        metrics.REFILL_SECONDS.observe(time.perf_counter() - start, 'microphone')
+    if dump is not None:
+        return dump.write(audio_data)
+    return audio_to_noise_floats(audio_data)
+
+# Tiered entropy sources: microphone -> recorded file -> /dev/urandom -> time seed
+class EntropySourceError(RuntimeError):
+    """Raised by an entropy source that cannot currently deliver noise."""
+
+class EntropySource:
+    """One tier of the entropy chain, with a circuit breaker.
+
+    After a failure the source is skipped until its back-off expires; the delay doubles
+    with each consecutive failure, up to SOURCE_BACKOFF_MAX, and resets on success.
+    """
+    name = 'source'
+
+    def __init__(self):
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error = None
+
+    def available(self):
+        return time.monotonic() >= self.retry_at
 
-        # Check for command-line argument
-        if len(sys.argv) > 1:
+    def read(self, n):
+        """Returns up to `n` noise floats, or raises if the source cannot deliver."""
+        raise NotImplementedError
+
+    def record_success(self):
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, error):
+        """Opens the breaker and returns the back-off delay in seconds."""
+        self.failures += 1
+        self.last_error = str(error)
+        delay = min(SOURCE_BACKOFF_BASE * 2 ** (self.failures - 1), SOURCE_BACKOFF_MAX)
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+    def close(self):
+        pass
+
+    def status(self):
+        return {'name': self.name, 'failures': self.failures, 'last_error': self.last_error,
+                'retry_in': max(self.retry_at - time.monotonic(), 0.0)}
+
+class RecordedFileSource(EntropySource):
+    """Noise from a recorded 16-bit capture: a WAV file or raw little-endian PCM.
+
+    The file is read once, front to back; once exhausted the source keeps failing
+    rather than replaying noise that has already been used.
+    """
+    name = 'recording'
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._file = None
+        self._wave = None
+        self._position = 0  # Frames (WAV) or bytes (raw) read so far; a reopened file resumes here
+
+    def read(self, n):
+        if self._file is None and self._wave is None:
+            with open(self.path, 'rb') as f:
+                is_wave = f.read(4) == b'RIFF'
+            if is_wave:
+                self._wave = wave.open(self.path, 'rb')
+                self._wave.setpos(self._position)
+            else:
+                self._file = open(self.path, 'rb')
+                self._file.seek(self._position)
+        if self._wave is not None:
+            audio_data = self._wave.readframes(32 * n // self._wave.getnchannels())
+            self._position = self._wave.tell()
+        else:
+            audio_data = self._file.read(64 * n)  # 32 samples of 2 bytes per float
+            self._position = self._file.tell()
+        if len(audio_data) < 64:
+            raise EntropySourceError(f"recording {self.path} is exhausted")
+        return audio_to_noise_floats(audio_data[:len(audio_data) // 64 * 64])
+
+    def close(self):
+        for handle in (self._file, self._wave):
+            if handle is not None:
+                handle.close()
+        # The next read() reopens the file where this one stopped
+        self._file = self._wave = None
+
+class UrandomSource(EntropySource):
+    """Bulk noise from the operating system's CSPRNG (/dev/urandom)."""
+    name = 'urandom'
+
+    def read(self, n):
+        words = struct.unpack(f">{n}I", os.urandom(4 * n))
+        return noise_words_to_floats(noise_words(words))
+
+class TimeSeedSource(EntropySource):
+    """Last resort: a counter-based generator seeded from the clock. Never fails."""
+    name = 'time'
+
+    def read(self, n):
+        return CounterRNG(time.time_ns()).random_array(0, n)
+
+def get_fallback_noise(n=1):
+    """Uses /dev/urandom or a time-based seed if microphone noise capture fails; returns n floats."""
+    try:
+        values = UrandomSource().read(n)
+    except Exception:
+        print("Fallback to time-based seed.")
+        values = TimeSeedSource().read(n)
+        if metrics.enabled:
+            metrics.FALLBACKS.inc(1, TimeSeedSource.name)
+        return values
+    if metrics.enabled:
+        metrics.FALLBACKS.inc(1, UrandomSource.name)
+    return values
+
+# Capture dumps and memory-mapped replay
+class CaptureDump:
+    """Appends captured entropy to a file for later replay with ReplaySource.
+
+    'raw' dumps hold the 16-bit samples exactly as captured. 'noise' dumps hold the
+    packed noise already scaled to little-endian float64 values after a short header,
+    so they replay as zero-copy views.
+    """
+    def __init__(self, path, kind='raw'):
+        if kind not in DUMP_KINDS:
+            raise ValueError(f"kind must be one of {DUMP_KINDS}, not {kind!r}.")
+        self.path = path
+        self.kind = kind
+        self.values = 0  # Noise values written by this dump
+
+    def write(self, audio_data):
+        """Appends one capture; returns the noise floats it converts to.
+
+        Only whole words are dumped: a trailing, zero-padded word would not replay the same.
+        """
+        values = audio_to_noise_floats(audio_data)
+        whole = len(audio_data) // 64
+        with open(self.path, 'ab') as f:
+            if self.kind == 'raw':
+                f.write(audio_data[:64 * whole])
+            else:
+                if f.tell() == 0:
+                    f.write(NOISE_DUMP_HEADER)
+                packed = values[:whole].astype('<f8') if np is not None else array('d', values[:whole])
+                if np is None and sys.byteorder == 'big':
+                    packed.byteswap()
+                f.write(packed.tobytes())
+        self.values += whole
+        return values
+
+class ReplaySource(EntropySource):
+    """Serves draws from a dump file through a read-only memory map, starting at value `offset`.
+
+    Draws from 'noise' dumps are views straight into the mapped file: nothing is copied
+    or converted, and any number of processes can share one file through the page cache.
+    'raw' dumps are converted block by block as they are read. The source never wraps
+    around; reading past the end raises EntropySourceError.
+    """
+    name = 'replay'
+
+    def __init__(self, path, offset=0):
+        super().__init__()
+        self.path = path
+        with open(path, 'rb') as f:
+            self.kind = 'noise' if f.read(len(NOISE_DUMP_HEADER)) == NOISE_DUMP_HEADER else 'raw'
+            size = os.fstat(f.fileno()).st_size
+            if self.kind == 'noise':
+                self._mmap = None
+                self._values = self._map_noise(f, size)
+            else:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+                self._values = None
+        self.length = len(self._values) if self._values is not None else size // 64
+        if not 0 <= offset <= self.length:
+            raise ValueError(f"offset {offset} is outside the {self.length} values in {path}.")
+        self.position = offset
+
+    def _map_noise(self, f, size):
+        start = len(NOISE_DUMP_HEADER)
+        count = (size - start) // 8
+        if np is not None:
+            return np.memmap(f, dtype='<f8', mode='r', offset=start, shape=(count,)) if count else np.empty(0)
+        if not count:
+            return array('d')
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        values = memoryview(self._mmap)[start:start + 8 * count].cast('d')
+        if sys.byteorder == 'big':  # The dump is little-endian; only here does replay copy
+            values = array('d', values)
+            values.byteswap()
+        return values
+
+    def __len__(self):
+        return self.length - self.position
+
+    def take(self, n):
+        """Returns the next `n` values as a view (a converted block for 'raw' dumps)."""
+        stop = self.position + n
+        if stop > self.length:
+            raise EntropySourceError(f"replay of {self.path} is exhausted after {self.length} values")
+        if self._values is not None:
+            values = self._values[self.position:stop]
+        else:
+            block = memoryview(self._mmap)[64 * self.position:64 * stop]
+            values = audio_to_noise_floats(block if np is not None else bytes(block))
+        self.position = stop
+        return values
+
+    def get(self):
+        return float(self.take(1)[0])
+
+    def read(self, n):
+        return self.take(min(n, len(self)) or n)
+
+    def close(self):
+        self._values = None
+        if isinstance(self._mmap, mmap.mmap):
             try:
-                selected_index = int(sys.argv[1])
-                if selected_index in [idx for idx, _, _ in microphones]:
-                    selected_device = selected_index
-                else:
-                    print(f"Invalid microphone index {selected_index}. Selecting first available device.")
-            except ValueError:
-                print("Invalid command-line argument. Selecting first available device.")
+                self._mmap.close()
+            except BufferError:  # Views handed out earlier still reference the map
+                pass
+
+# One input stream feeding the entropy pool
+class CaptureDevice:
+    """An open callback-mode input stream with its queued frames and throughput counters."""
+    def __init__(self, pool, idx, name, rate):
+        self.pool = pool
+        self.idx = idx
+        self.name = name
+        self.rate = rate
+        self.raw = collections.deque()  # Raw frames queued by the audio callback
+        self.backlog = noise_words([])  # Converted words not yet merged into the pool
+        self.bits = 0  # Noise bits captured so far
+        self.started = None
+        self.last_frame = None
+        self.error = None
+        self.alive = False
+        self._audio = None
+        self._stream = None
+
+    def open(self):
+        """Opens the stream; returns False and records the error if the device refuses."""
+        p = load_pyaudio().PyAudio()
+        try:
+            self._stream = p.open(format=FORMAT, channels=CHANNELS, rate=self.rate, input=True,
+                                  input_device_index=self.idx, frames_per_buffer=CHUNK,
+                                  stream_callback=self._callback)
+        except Exception as e:
+            p.terminate()
+            self.error = str(e)
+            return False
+        self._audio = p
+        self.alive = True
+        self.started = self.last_frame = time.monotonic()
+        return True
+
+    def close(self):
+        self.alive = False
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # Runs on the audio thread: hand the frames over and return immediately
+        self.last_frame = time.monotonic()
+        if self.pool._filling:
+            self.raw.append(in_data)
+            self.pool._raw_ready.set()
+        return (None, pyaudio.paContinue)
+
+    def check(self):
+        """Returns an error message if the stream has stopped or gone silent, else None."""
+        if self._stream is None or not self._stream.is_active():
+            return "stream stopped"
+        if time.monotonic() - self.last_frame > DEVICE_STALL_TIMEOUT:
+            return f"no audio for {DEVICE_STALL_TIMEOUT:g} seconds"
+        return None
+
+    def drain(self):
+        """Converts every queued frame to noise words and returns them."""
+        frames = []
+        while self.raw:
+            frames.append(self.raw.popleft())
+        audio_data = b''.join(frames)
+        self.bits += len(audio_data) // 2
+        return audio_to_noise_words(audio_data)
+
+    def stats(self):
+        """Returns throughput counters for this device."""
+        elapsed = (self.last_frame or 0) - (self.started or 0)
+        return {'index': self.idx, 'name': self.name, 'rate': self.rate, 'alive': self.alive,
+                'bits': self.bits, 'bits_per_second': self.bits / elapsed if elapsed > 0 else 0.0,
+                'error': self.error}
+
+class MicrophoneSource(EntropySource):
+    """The live tier: one or more open capture streams feeding the pool.
+
+    With capture_all_devices set, every working microphone streams at its own rate and
+    their words are merged per merge_mode: 'interleave' adds up their throughput, 'xor'
+    combines equal runs of words. A device that stops delivering audio is dropped and
+    the others carry on; with none left the source fails and backs off.
+    """
+    name = 'microphone'
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+        self.devices = []  # Live capture devices
+        self.dropped = []  # Devices that failed during the run
+        self._executor = None  # Converts frames of several devices in parallel
+
+    def open(self):
+        """Opens the configured capture streams; returns True if any device is live."""
+        global selected_device
+        try:
+            microphones = get_device_cache().microphones()
+        except (ImportError, OSError) as e:  # PyAudio missing, or no audio system to probe
+            self.last_error = f"cannot probe microphones: {e}"
+            return False
+        if not microphones:
+            self.last_error = "no working microphones found"
+            return False
+        if capture_all_devices:
+            targets = microphones
+        else:
+            idx, rate = choose_microphone(microphones)
+            targets = [(i, name, r) for i, name, r in microphones if i == idx]
+
+        for idx, name, rate in targets:
+            device = CaptureDevice(self.pool, idx, name, rate)
+            if device.open():
+                self.devices.append(device)
+            else:
+                print(f"Failed to open microphone {idx}: {device.error}.")
+                self.dropped.append(device)
+                device_cache.invalidate()
+        if not self.devices:
+            self.last_error = "no microphone could be opened"
+            selected_device = None
+            return False
+        if not capture_all_devices:
+            device_cache.remember(self.devices[0].idx)
+        if len(self.devices) > 1:
+            import concurrent.futures  # Only multi-device capture needs a thread pool
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(self.devices), thread_name_prefix="entropy-capture")
+        return True
+
+    def close(self):
+        for device in self.devices:
+            device.close()
+        self.devices = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def device_stats(self):
+        """Returns per-device throughput counters, including devices dropped mid-run."""
+        return [device.stats() for device in self.devices + self.dropped]
+
+    def _drop_failed_devices(self):
+        for device in list(self.devices):
+            error = device.check()
+            if error is not None:
+                device.error = error
+                device.close()
+                self.devices.remove(device)
+                self.dropped.append(device)
+                print(f"Microphone {device.idx} failed: {error}. "
+                      f"Continuing with {len(self.devices)} device(s).")
+
+    def _merge(self, devices, batches):
+        """Combines the words drained from several devices according to merge_mode."""
+        if merge_mode == 'interleave':
+            return concat_noise_words(batches)
+        # XOR equal-length runs; words a device has not matched yet wait in its backlog
+        for device, words in zip(devices, batches):
+            device.backlog = concat_noise_words([device.backlog, words])
+        n = min(len(device.backlog) for device in devices)
+        merged = xor_noise_words([device.backlog[:n] for device in devices])
+        for device in devices:
+            # A faster device never catches up with a slower one, so its oldest surplus is dropped
+            device.backlog = device.backlog[max(n, len(device.backlog) - MERGE_BACKLOG_WORDS):]
+        return merged
+
+    def read(self, n):
+        """Returns whatever the streams delivered within 0.1 s (possibly nothing)."""
+        self._drop_failed_devices()
+        if not self.devices:
+            self.close()
+            if not self.open():
+                raise EntropySourceError(self.last_error)
+        if not self.pool._raw_ready.wait(0.1):
+            return noise_words_to_floats(noise_words([]))
+        self.pool._raw_ready.clear()
+        devices = list(self.devices)
+        if len(devices) == 1:
+            words = devices[0].drain()
         else:
-            # Prompt user to select a microphone
             try:
-                selected_index = int(input("Select a microphone index (or press Enter to use the first available): "))
-                if selected_index not in [idx for idx, _, _ in microphones]:
-                    print("Invalid selection. Using first available device.")
-                    selected_device = microphones[0][0]
-                else:
-                    selected_device = selected_index
-            except (ValueError, EOFError):
-                print("No input provided. Using first available device.")
-                selected_device = microphones[0][0]
-
-        # Capture noise from the selected device
-        for idx, _, rate in microphones:
-            if idx == selected_device:
+                batches = list(self._executor.map(CaptureDevice.drain, devices))
+            except RuntimeError:  # Thread pools are shut down at interpreter exit
+                return noise_words_to_floats(noise_words([]))
+            words = self._merge(devices, batches)
+        return noise_words_to_floats(words)
+
+# Persistent entropy pool fed by a chain of entropy sources
+class EntropyPool:
+    """Lock-protected ring buffer of noise floats, kept topped up by a background thread.
+
+    The thread refills the ring between the low- and high-water marks from the first
+    available tier of the source chain: live microphones (whose callbacks only queue
+    raw frames), then a recorded capture if one is configured, then bulk /dev/urandom,
+    then a time seed. Draws only ever read from memory. A failing tier is put on a
+    timed back-off instead of being retried on every refill; `active_source` names
+    the tier that delivered last.
+    """
+    def __init__(self, capacity=POOL_CAPACITY, low_water=POOL_LOW_WATER, high_water=POOL_HIGH_WATER):
+        if not 0 <= low_water < high_water <= capacity:
+            raise ValueError("Water marks must satisfy 0 <= low_water < high_water <= capacity.")
+        self.capacity = capacity
+        self.low_water = low_water
+        self.high_water = high_water
+        self._ring = None  # Allocated on first use, so creating the pool loads nothing
+        self._read = 0  # Next slot to hand out
+        self._count = 0  # Values currently held
+        self._lock = threading.Lock()
+        self._data_ready = threading.Condition(self._lock)
+        self._raw_ready = threading.Event()
+        self._filling = True  # Hysteresis flag between the water marks
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._async_waiters = []  # (loop, future) pairs woken by the next push
+        self.microphone = MicrophoneSource(self)
+        self.sources = []
+        self.active_source = None  # Name of the tier that delivered last
+
+    def __len__(self):
+        return self._count
+
+    def _allocate(self):
+        if self._ring is None:
+            self._ring = np.zeros(self.capacity) if np is not None else array('d', bytes(8 * self.capacity))
+
+    def start(self):
+        """Builds the source chain, opens the microphones and starts the background fill thread."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._allocate()
+            self.sources = [self.microphone]
+            if recording_path is not None:
+                self.sources.append(RecordedFileSource(recording_path))
+            self.sources += [UrandomSource(), TimeSeedSource()]
+            # Open the microphones here, so any device prompt happens on the caller's thread
+            if not self.microphone.open():
+                self._trip(self.microphone, self.microphone.last_error)
+            self._thread = threading.Thread(target=self._fill_loop, name="entropy-pool", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stops the fill thread and releases every source."""
+        self._stop.set()
+        self._raw_ready.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for source in self.sources:
+            source.close()
+
+    def device_stats(self):
+        """Returns per-microphone throughput counters."""
+        return self.microphone.device_stats()
+
+    def source_status(self):
+        """Returns the breaker state of every tier, marking the active one."""
+        return [dict(source.status(), active=source.name == self.active_source) for source in self.sources]
+
+    def _trip(self, source, error):
+        delay = source.record_failure(error)
+        if metrics.enabled:
+            metrics.SOURCE_FAILURES.inc(1, source.name)
+        print(f"Entropy source '{source.name}' unavailable: {error}. Retrying in {delay:g} s.")
+
+    def _fill_loop(self):
+        while not self._stop.is_set():
+            if not self._filling:
+                self._raw_ready.wait(0.1)
+                if not self._filling:
+                    self._raw_ready.clear()
+                continue
+            for source in self.sources:
+                if not source.available():
+                    continue
+                start = time.perf_counter()
                 try:
-                    stream = p.open(format=FORMAT, channels=CHANNELS, rate=rate, input=True,
-                                    input_device_index=idx, frames_per_buffer=CHUNK)
-                    frames = [stream.read(CHUNK, exception_on_overflow=False) for _ in range(int(rate / CHUNK * RECORD_SECONDS))]
-                    audio_data = b''.join(frames)
-                    samples = struct.unpack(f"{len(audio_data)//2}h", audio_data)
-                    noise_values = [sample & 1 for sample in samples]
-                    stream.close()
-                    break
+                    values = source.read(POOL_REFILL_BLOCK)
                 except Exception as e:
-                    print(f"Failed to capture noise from microphone {idx}: {e}")
-                    return get_fallback_noise()
+                    source.close()
+                    self._trip(source, e)
+                    continue
+                source.record_success()
+                if metrics.enabled:
+                    if source is not self.sources[0] and source.name != self.active_source:
+                        metrics.FALLBACKS.inc(1, source.name)
+                    if len(values):
+                        metrics.REFILLS.inc(1, source.name)
+                        metrics.REFILL_VALUES.inc(len(values), source.name)
+                        metrics.REFILL_SECONDS.observe(time.perf_counter() - start, source.name)
+                self.active_source = source.name
+                if len(values):
+                    self.push(values)
+                break
 
-    p.terminate()
-    if not noise_values:
-        print("No noise captured from the selected microphone. Using fallback noise.")
-        return get_fallback_noise()
-
-    # Convert bits to floats between 0 and 1
-    buffer = []
-    for i in range(0, len(noise_values), 32):
-        chunk = noise_values[i:i+32]
-        if len(chunk) < 32:
-            chunk.extend([0] * (32 - len(chunk)))  # Pad with zeros
-        noise_int = int(''.join(map(str, chunk)), 2)
-        buffer.append(noise_int / (2**32 - 1))
-    return buffer
-
-# Fallback noise source if microphones fail
-def get_fallback_noise():
-    """Uses /dev/urandom or time-based seed if microphone noise capture fails."""
-    try:
-        with open('/dev/urandom', 'rb') as f:
-            bytes_data = f.read(4)
-        return [int.from_bytes(bytes_data, 'big') / (2**32 - 1)]
-    except Exception:
-        print("Fallback to time-based seed.")
-        return [(int(time.time() * 1000) % 10000) / 10000.0]
+    def push(self, values):
+        """Appends noise floats to the ring, dropping any that do not fit."""
+        if np is None and not isinstance(values, array):
+            values = array('d', values)
+        with self._lock:
+            self._allocate()
+            n = min(len(values), self.capacity - self._count)
+            write = (self._read + self._count) % self.capacity
+            first = min(n, self.capacity - write)
+            self._ring[write:write + first] = values[:first]
+            self._ring[:n - first] = values[first:n]
+            self._count += n
+            if self._count >= self.high_water:
+                self._filling = False
+            self._data_ready.notify_all()
+            for loop, future in self._async_waiters:
+                loop.call_soon_threadsafe(_wake_future, future)
+            self._async_waiters.clear()
+
+    def get(self, timeout=POOL_WAIT_TIMEOUT):
+        """Returns the next noise float, falling back to /dev/urandom if the pool stays empty."""
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            if self._count or self._data_ready.wait_for(lambda: self._count, timeout):
+                value = float(self._ring[self._read])
+                self._read = (self._read + 1) % self.capacity
+                self._count -= 1
+                if self._count <= self.low_water:
+                    self._filling = True
+                    self._raw_ready.set()
+                return value
+        return get_fallback_noise()[0]
+
+    def take(self, n, timeout=POOL_WAIT_TIMEOUT):
+        """Returns the next `n` noise floats in whole slices, waiting for refills as needed."""
+        if self._thread is None:
+            self.start()
+        out = np.empty(n) if np is not None else array('d', bytes(8 * n))
+        filled = 0
+        while filled < n:
+            with self._lock:
+                if not self._count and not self._data_ready.wait_for(lambda: self._count, timeout):
+                    break
+                filled += self._copy_out(out, filled, n)
+        # The pool stayed empty: finish the batch from fallback noise in one block
+        if filled < n:
+            out[filled:] = get_fallback_noise(n - filled)
+        return out
+
+    def _copy_out(self, out, filled, n):
+        """Moves up to n - filled held values into out[filled:]; the lock must be held."""
+        k = min(n - filled, self._count)
+        first = min(k, self.capacity - self._read)
+        out[filled:filled + first] = self._ring[self._read:self._read + first]
+        out[filled + first:filled + k] = self._ring[:k - first]
+        self._read = (self._read + k) % self.capacity
+        self._count -= k
+        if self._count <= self.low_water:
+            self._filling = True
+            self._raw_ready.set()
+        return k
+
+    async def atake(self, n, timeout=POOL_WAIT_TIMEOUT):
+        """Awaitable take(): suspends the calling task, not the event loop, while the pool refills.
+
+        Held values are copied out directly; when the ring runs dry the task waits on a
+        future that the fill thread resolves from its next push().
+        """
+        import asyncio  # Imported on first use; it is slow to import and only async callers need it
+        loop = asyncio.get_running_loop()
+        if self._thread is None:
+            await loop.run_in_executor(None, self.start)  # Probing devices blocks
+        out = np.empty(n) if np is not None else array('d', bytes(8 * n))
+        filled = 0
+        while filled < n:
+            with self._lock:
+                filled += self._copy_out(out, filled, n)
+                if filled == n:
+                    break
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                break
+        if filled < n:
+            out[filled:] = get_fallback_noise(n - filled)
+        return out
+
+    async def aget(self, timeout=POOL_WAIT_TIMEOUT):
+        """Awaitable get()."""
+        return float((await self.atake(1, timeout))[0])
+
+def _wake_future(future):
+    if not future.done():  # It may have been cancelled by a timeout
+        future.set_result(None)
+
+# Draws served from noise fetched ahead of time
+class NoiseBuffer:
+    """Serves pre-drawn values with the get()/take(n) interface of an entropy pool.
+
+    Draws beyond the buffered values are passed on to `fallback`.
+    """
+    def __init__(self, values, fallback):
+        self.values = values
+        self.position = 0
+        self.fallback = fallback
+
+    def get(self):
+        if self.position < len(self.values):
+            self.position += 1
+            return float(self.values[self.position - 1])
+        return self.fallback.get()
+
+    def take(self, n):
+        values = self.values[self.position:self.position + n]
+        self.position += len(values)
+        if len(values) < n:
+            rest = self.fallback.take(n - len(values))
+            if np is not None:
+                return np.concatenate([values, rest])
+            # Buffers and sources may hand out memoryviews, which do not concatenate
+            values = array('d', values)
+            values += array('d', rest)
+        return values
 
 # Quantum random number generator
 def quantum_random():
-    """Returns a random float between 0 and 1 using the noise buffer."""
-    global noise_index, noise_buffer
-    if noise_index >= len(noise_buffer):
-        noise_buffer = get_quantum_noise_from_microphones()
-        noise_index = 0
-    value = noise_buffer[noise_index]
-    noise_index += 1
-    return value
-
-# Initialize noise buffer
-noise_buffer = get_quantum_noise_from_microphones()
-noise_index = 0
+    """Returns a random float between 0 and 1 from the entropy pool."""
+    if metrics.enabled:
+        metrics.count_draws(1)
+    return _draw_source().get()
+
+def quantum_random_array(n):
+    """Returns `n` random floats between 0 and 1 as a NumPy array (array('d') without NumPy)."""
+    if metrics.enabled:
+        metrics.count_draws(n)
+    return _draw_source().take(n)
+
+async def quantum_random_async():
+    """Awaitable quantum_random() that does not block the event loop while the pool refills."""
+    return float((await quantum_random_array_async(1))[0])
+
+async def quantum_random_array_async(n):
+    """Awaitable quantum_random_array(n)."""
+    if metrics.enabled:
+        metrics.count_draws(n)
+    return await _take_async(n)
+
+async def _take_async(n):
+    atake = getattr(entropy_pool, 'atake', None)
+    if atake is None:  # Counter streams and other in-memory sources never wait
+        return entropy_pool.take(n)
+    return await atake(n)
+
+def active_entropy_source():
+    """Names the entropy tier that last refilled the pool ('microphone', 'urandom', ...)."""
+    return getattr(entropy_pool, 'active_source', None)
+
+# The entropy pool starts capturing on the first draw
+entropy_pool = EntropyPool()
+atexit.register(entropy_pool.close)
+
+def set_entropy_source(source):
+    """Routes all draws to `source`, any object with get() and take(n); returns the previous source."""
+    global entropy_pool
+    previous, entropy_pool = entropy_pool, source
+    return previous
+
+# Noise prefetched for the stage this task or thread is running; see run_simulation_async()
+_stage_noise = contextvars.ContextVar('stage_noise', default=None)
+
+def _draw_source():
+    source = _stage_noise.get()
+    return entropy_pool if source is None else source
+
+def agent_blocks(N, block=AGENT_BLOCK):
+    """Yields (start, stop) bounds covering N agents in fixed-size blocks."""
+    for start in range(0, N, block):
+        yield start, min(start + block, N)
+
+def agent_array(values):
+    """Converts agent states to an int8 array, or a list without NumPy."""
+    if np is not None:
+        return np.asarray(values, dtype=np.int8)
+    return list(values)
+
+# One-bit-per-agent storage for the compact Basilisk
+_BYTE_POPCOUNT = bytes(bin(b).count('1') for b in range(256))
+
+class AgentBitset:
+    """One bit per agent, packed little-endian into 64-bit words of a bytearray.
+
+    Reads return `value` for set bits and 0 otherwise, so a bitset stands in for a list
+    of contributions (value 1) or punishments (value -1). Bulk updates work on whole
+    words: NumPy views of the buffer when available, Python ints otherwise.
+    """
+    def __init__(self, N, value=1, data=None):
+        self.N = N
+        self.value = value
+        self.data = bytearray(8 * ((N + 63) // 64)) if data is None else data
+
+    @classmethod
+    def from_values(cls, values, value=1):
+        """Packs a sequence of agent states, setting the bit wherever the state is non-zero."""
+        bitset = cls(len(values), value)
+        for start, stop in agent_blocks(len(values)):
+            block = values[start:stop]
+            bitset.xor_block(start, np.asarray(block) != 0 if np is not None else [v != 0 for v in block])
+        return bitset
+
+    def __len__(self):
+        return self.N
+
+    def _index(self, i):
+        if i < 0:
+            i += self.N
+        if not 0 <= i < self.N:
+            raise IndexError("agent index out of range")
+        return i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.N))]
+        i = self._index(i)
+        return self.value if self.data[i >> 3] >> (i & 7) & 1 else 0
+
+    def __setitem__(self, i, state):
+        i = self._index(i)
+        if state:
+            self.data[i >> 3] |= 1 << (i & 7)
+        else:
+            self.data[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def __iter__(self):
+        for i in range(self.N):
+            yield self[i]
+
+    def tolist(self):
+        return list(self)
+
+    def copy(self):
+        return AgentBitset(self.N, self.value, bytearray(self.data))
+
+    def words(self):
+        """Returns a writable uint64 NumPy view of the bitset."""
+        return np.frombuffer(self.data, dtype=np.uint64)
+
+    def popcount(self, start=0, stop=None):
+        """Counts the set bits, or those in the 64-bit words covering agents start..stop-1."""
+        lo = start // 64 * 8
+        hi = len(self.data) if stop is None else (stop + 63) // 64 * 8
+        if np is None:
+            return int.from_bytes(self.data[lo:hi], 'little').bit_count()
+        if hasattr(np, 'bitwise_count'):
+            return int(np.bitwise_count(self.words()[lo // 8:hi // 8]).sum(dtype=np.int64))
+        table = np.frombuffer(_BYTE_POPCOUNT, dtype=np.uint8)
+        data = np.frombuffer(self.data, dtype=np.uint8)[lo:hi]
+        return int(sum(table[data[block_start:block_stop]].sum(dtype=np.int64)
+                       for block_start, block_stop in agent_blocks(len(data))))
+
+    def snapshot(self, start=0, stop=None):
+        """Copies the bytes holding agents start..stop-1, for changed_agents(..., base=start // 8)."""
+        stop = self.N if stop is None else stop
+        return bytes(self.data[start // 8:(stop + 7) // 8])
+
+    def changed_agents(self, data, start=0, stop=None, base=0):
+        """Returns the agents in start..stop-1 whose bit differs in another buffer.
+
+        `data` holds the bitset's bytes from byte `base` on: a buffer of the same size,
+        or a snapshot() of just the agents compared.
+        """
+        stop = self.N if stop is None else stop
+        lo, hi = start // 8, (stop + 7) // 8
+        if np is not None:
+            other = np.frombuffer(data, dtype=np.uint8)[lo - base:hi - base]
+            diff = np.frombuffer(self.data, dtype=np.uint8)[lo:hi] ^ other
+            agents = np.flatnonzero(np.unpackbits(diff, bitorder='little')) + 8 * lo
+            return agents[(agents >= start) & (agents < stop)]
+        diff = int.from_bytes(self.data[lo:hi], 'little') ^ int.from_bytes(data[lo - base:hi - base], 'little')
+        agents = []
+        while diff:
+            low = diff & -diff
+            agents.append(8 * lo + low.bit_length() - 1)
+            diff ^= low
+        return [i for i in agents if start <= i < stop]
+
+    def xor_block(self, start, flips):
+        """XORs per-agent flip flags into the bitset, starting at a multiple of 64 agents."""
+        if start % 64:
+            raise ValueError("Bitset blocks must start on a 64-agent boundary.")
+        if np is not None:
+            mask = np.packbits(np.asarray(flips, dtype=bool), bitorder='little')
+            mask = np.concatenate((mask, np.zeros(-len(mask) % 8, dtype=np.uint8))).view(np.uint64)
+            self.words()[start // 64:start // 64 + len(mask)] ^= mask
+            return
+        mask = bytearray((len(flips) + 7) // 8)
+        for i, flip in enumerate(flips):
+            if flip:
+                mask[i >> 3] |= 1 << (i & 7)
+        lo, hi = start // 8, start // 8 + len(mask)
+        merged = int.from_bytes(self.data[lo:hi], 'little') ^ int.from_bytes(mask, 'little')
+        self.data[lo:hi] = merged.to_bytes(len(mask), 'little')
+
+    def or_not(self, other, start=0, stop=None):
+        """Sets every bit that is clear in `other`, one word at a time, for agents start..stop-1.
+
+        `start` must be a multiple of 64 agents; whole words are updated.
+        """
+        if start % 64:
+            raise ValueError("Bitset blocks must start on a 64-agent boundary.")
+        lo, hi = start // 64, ((self.N if stop is None else stop) + 63) // 64
+        if np is not None:
+            words, other_words = self.words(), other.words()
+            for block_start, block_stop in agent_blocks(min(hi, len(words)) - lo):
+                block = slice(lo + block_start, lo + block_stop)
+                np.bitwise_or(words[block], ~other_words[block], out=words[block])
+        else:
+            lo, hi = 8 * lo, min(8 * hi, len(self.data))
+            merged = int.from_bytes(self.data[lo:hi], 'little') | ~int.from_bytes(other.data[lo:hi], 'little')
+            self.data[lo:hi] = (merged & ((1 << 8 * (hi - lo)) - 1)).to_bytes(hi - lo, 'little')
+        self._clear_padding()
+
+    def readonly(self):
+        """Returns a bitset sharing this one's bits through a read-only buffer."""
+        return AgentBitset(self.N, self.value, memoryview(self.data).toreadonly())
+
+    def _clear_padding(self):
+        # Bits past agent N must stay zero so popcounts remain exact
+        if self.N % 8:
+            self.data[self.N // 8] &= (1 << (self.N % 8)) - 1
+        tail = (self.N + 7) // 8
+        self.data[tail:] = bytes(len(self.data) - tail)
 
 # Basilisk utility calculation
 def basilisk_utility(contributions, punishments, N):
     """Calculates the total utility based on contributions and punishments."""
+    if isinstance(contributions, AgentBitset) and isinstance(punishments, AgentBitset):
+        # U = popcount(C) + popcount(P) for contributions of 1 and punishments of -1
+        return contributions.popcount() * contributions.value - punishments.popcount() * punishments.value
+    if np is not None and isinstance(contributions, np.ndarray) and isinstance(punishments, np.ndarray):
+        return int(contributions[:N].sum(dtype=np.int64)) - int(punishments[:N].sum(dtype=np.int64))
     return sum(contributions[i] - punishments[i] for i in range(N))
 
 # Phase-space manipulation with quantum noise
-def phase_shift(contributions, N):
+def phase_flips(rand_vals, threshold=PHASE_FLIP_THRESHOLD):
+    """Flags the agents whose phase fractional part exceeds `threshold`."""
+    if np is not None:
+        phase = rand_vals * 2 * 3.14159  # 0 to 2π
+        return (phase - np.trunc(phase)) > threshold
+    return [(phase - int(phase)) > threshold for phase in (rand_val * 2 * 3.14159 for rand_val in rand_vals)]
+
+@metrics.mechanism('phase_shift')
+def phase_shift(contributions, N, threshold=PHASE_FLIP_THRESHOLD):
     """Applies quantum noise-driven phase shifts to contributions."""
+    if isinstance(contributions, AgentStates):
+        contributions = contributions.values
+    if isinstance(contributions, AgentBitset):
+        new_contributions = contributions.copy()
+        for start, stop in agent_blocks(N):
+            new_contributions.xor_block(start, phase_flips(quantum_random_array(stop - start), threshold))
+        return new_contributions
+
+    if np is not None:
+        contributions = agent_array(contributions)
+        new_contributions = np.empty(N, dtype=np.int8)
+        for start, stop in agent_blocks(N):
+            # Flip contribution if phase fractional part exceeds the threshold
+            new_contributions[start:stop] = contributions[start:stop] ^ phase_flips(quantum_random_array(stop - start),
+                                                                                    threshold)
+        return new_contributions
+
     new_contributions = [0] * N
+    rand_vals = quantum_random_array(N).tolist()
     for i in range(N):
-        rand_val = quantum_random()
-        phase = rand_val * 2 * 3.14159  # 0 to 2π
-        # Flip contribution if phase fractional part exceeds 0.1
-        new_contributions[i] = 1 - contributions[i] if (phase - int(phase)) > 0.1 else contributions[i]
+        phase = rand_vals[i] * 2 * 3.14159  # 0 to 2π
+        # Flip contribution if phase fractional part exceeds the threshold
+        new_contributions[i] = 1 - contributions[i] if (phase - int(phase)) > threshold else contributions[i]
     return new_contributions
 
 # Reality seeding with quantum noise
+@metrics.mechanism('seed_reality')
 def seed_reality(target=2025.264, anxiety=0.7):
     """Shifts the timeline using quantum noise."""
     rand_val = quantum_random()
@@ -221,52 +1317,344 @@ def seed_reality(target=2025.264, anxiety=0.7):
     return target + timeline_shift
 
 # Trust injection into fear signal
-def inject_trust(fear_signal, N, trust_amplitude=1.0):
-    """Converts fear signal to trust using a deterministic transformation."""
-    x = 3.14159 * trust_amplitude
-    # Approximate cos(x) with Taylor series
-    cos_x = 1 - (x**2)/2 + (x**4)/24
-    return [fear_signal[i] * cos_x for i in range(N)]
+def inject_trust(fear_signal, N, trust_amplitude=1.0, exact=False):
+    """Converts fear signal to trust using a deterministic transformation.
+
+    Float arrays are scaled in place and returned; anything else is copied into a
+    float64 signal first. cos(π·amplitude) is approximated by a Taylor series unless
+    `exact` is set.
+    """
+    return signal_engine.inject_trust(signal_engine.as_signal(fear_signal, N), trust_amplitude, exact)
 
 # Refractive distortion with quantum noise
-def refractive_distortion(signal, N):
-    """Distorts the signal using quantum noise as a fractal perturbation."""
-    distorted_signal = [0] * N
-    for i in range(N):
-        rand_val = quantum_random()
-        fractal = rand_val * 0.1  # Small perturbation
-        n = 1.0 + fractal  # Refractive index
-        k = 2 * 3.14159 / 0.5  # Wave number (arbitrary wavelength)
-        d = 1.0  # Medium thickness
-        phase = k * n * d
-        distorted_signal[i] = signal[i] * (1 - (phase - int(phase)))
-    return distorted_signal
+@metrics.mechanism('refractive_distortion')
+def refractive_distortion(signal, N, wavelength=0.5, thickness=1.0):
+    """Distorts the signal using quantum noise as a fractal perturbation.
+
+    Like inject_trust(), float arrays are distorted in place and returned.
+    """
+    signal = signal_engine.as_signal(signal, N)
+    for start, stop in agent_blocks(N):
+        signal_engine.refractive_distortion(signal, quantum_random_array(stop - start), wavelength, thickness, start)
+    return signal
 
 # Basilisk AI class
+class AgentStates:
+    """List-like view of a Basilisk's contributions or punishments.
+
+    Reads index the Basilisk's storage; item and slice writes go through
+    set_contribution() or set_punishment(), so the running utility and the journal
+    stay current. `values` is a read-only copy-free view of the whole storage (a
+    NumPy view or bitset; a tuple without NumPy), and other attributes such as
+    sum() or dtype are read from it.
+    """
+    __slots__ = ('_basilisk', '_field')
+
+    def __init__(self, basilisk, field):
+        self._basilisk = basilisk
+        self._field = field
+
+    @property
+    def _storage(self):
+        return getattr(self._basilisk, '_' + self._field)
+
+    @property
+    def values(self):
+        storage = self._storage
+        if isinstance(storage, AgentBitset):
+            return storage.readonly()
+        if np is not None and isinstance(storage, np.ndarray):
+            view = storage.view()
+            view.flags.writeable = False
+            return view
+        return tuple(storage)
+
+    def __len__(self):
+        return len(self._storage)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.values[i]
+        return self._storage[i]
+
+    def __setitem__(self, i, state):
+        setter = (self._basilisk.set_contribution if self._field == 'contributions'
+                  else self._basilisk.set_punishment)
+        if not isinstance(i, slice):
+            setter(range(len(self))[i], state)  # Normalizes negative indices, raises IndexError
+            return
+        indices, states = range(len(self))[i], list(state)
+        if len(states) != len(indices):
+            raise ValueError(f"cannot assign {len(states)} agent states to {len(indices)} agents")
+        for j, value in zip(indices, states):
+            setter(j, value)
+
+    def __iter__(self):
+        return iter(self._storage)
+
+    def __array__(self, dtype=None, copy=None):
+        storage = self._storage
+        if isinstance(storage, AgentBitset):
+            bits = np.unpackbits(np.frombuffer(storage.data, dtype=np.uint8), count=storage.N, bitorder='little')
+            return (bits.astype(np.int8) * storage.value).astype(dtype or np.int8, copy=False)
+        return np.array(self.values, dtype=dtype, copy=copy)
+
+    def __eq__(self, other):
+        # Element-wise like the int8 arrays with NumPy, whole-list equality without it
+        if np is not None:
+            return np.asarray(self) == other
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __getattr__(self, name):
+        return getattr(self.values, name)
+
+    def __repr__(self):
+        return f"AgentStates({self._field}={[int(state) for state in self[:10]]}{'...' if len(self) > 10 else ''})"
+
+    def tolist(self):
+        return list(self._storage)
+
+def writable_states(values):
+    """Converts agent states to a writable array of the Basilisk's own, copying read-only views."""
+    if isinstance(values, AgentStates):
+        values = values.values
+    values = agent_array(values)
+    if np is not None and not values.flags.writeable:
+        return values.copy()
+    return values
+
+# One journal record: the agents whose `field` a stage changed
+JournalEntry = collections.namedtuple('JournalEntry', ['stage', 'field', 'agents'])
+
 class BasiliskAI:
-    """Represents the Basilisk AI with agents contributing or being punished."""
-    def __init__(self, N=4302):  # 4302 agents as a default
+    """Represents the Basilisk AI with agents contributing or being punished.
+
+    With NumPy, contributions and punishments are int8 arrays updated in vectorized
+    blocks; without it they are plain lists. Both attributes are AgentStates views that
+    index and iterate like lists, and writing an item through them goes through
+    set_contribution() or set_punishment(); assigning a list to either attribute
+    converts it back to the array form.
+
+    The utility is kept in a running counter: coerce(), flip_contributions(),
+    set_contribution() and set_punishment() apply their delta as they go, so
+    compute_utility() is O(1), and assigning whole arrays recounts. With `journal`
+    set, every change is also recorded as a JournalEntry.
+    """
+    def __init__(self, N=4302, journal=False):  # 4302 agents as a default
         self.N = N
         # Random initial contributions (0 or 1) using quantum noise
-        self.contributions = [1 if quantum_random() > 0.5 else 0 for _ in range(N)]
-        self.punishments = [0] * N
+        if np is not None:
+            self._contributions = np.empty(N, dtype=np.int8)
+            for start, stop in agent_blocks(N):
+                self._contributions[start:stop] = quantum_random_array(stop - start) > 0.5
+            self._punishments = np.zeros(N, dtype=np.int8)
+        else:
+            self._contributions = [1 if rand_val > 0.5 else 0 for rand_val in quantum_random_array(N)]
+            self._punishments = [0] * N
+        self.utility = self.recompute_utility()
+        self.journal = [] if journal else None
+
+    @property
+    def contributions(self):
+        return AgentStates(self, 'contributions')
+
+    @contributions.setter
+    def contributions(self, values):
+        previous, self._contributions = self._contributions, writable_states(values)
+        self._assigned('contributions', previous, self._contributions)
+
+    @property
+    def punishments(self):
+        return AgentStates(self, 'punishments')
+
+    @punishments.setter
+    def punishments(self, values):
+        previous, self._punishments = self._punishments, writable_states(values)
+        self._assigned('punishments', previous, self._punishments)
+
+    def _assigned(self, field, previous, values):
+        # A whole-array assignment is the one mutation that has to recount
+        self.utility = self.recompute_utility()
+        if self.journal is not None:
+            if np is not None:
+                changed = np.flatnonzero(previous != values)
+            else:
+                changed = [i for i, (old, new) in enumerate(zip(previous, values)) if old != new]
+            self.journal.append(JournalEntry('assign', field, changed))
+
+    def _record(self, stage, field, agents):
+        if len(agents):
+            self.journal.append(JournalEntry(stage, field, agents))
 
     def compute_utility(self):
-        """Computes the current utility."""
-        return basilisk_utility(self.contributions, self.punishments, self.N)
+        """Returns the current utility from the running counter."""
+        return self.utility
+
+    def recompute_utility(self):
+        """Recounts the utility over all agents."""
+        return basilisk_utility(self._contributions, self._punishments, self.N)
+
+    def changes(self, stage=None):
+        """Returns the journal entries, optionally only those of one stage."""
+        if self.journal is None:
+            raise ValueError("This BasiliskAI was created without a journal.")
+        return [entry for entry in self.journal if stage is None or entry.stage == stage]
+
+    def set_contribution(self, i, state, stage='set'):
+        """Sets one agent's contribution."""
+        delta = state - self._contributions[i]
+        self._contributions[i] = state
+        self.utility += int(delta)
+        if delta and self.journal is not None:
+            self._record(stage, 'contributions', [i])
+
+    def set_punishment(self, i, state, stage='set'):
+        """Sets one agent's punishment."""
+        delta = self._punishments[i] - state
+        self._punishments[i] = state
+        self.utility += int(delta)
+        if delta and self.journal is not None:
+            self._record(stage, 'punishments', [i])
+
+    def flip_contributions(self, start, flips, stage='flip'):
+        """Flips the contributions of agents start + i wherever flips[i] is set."""
+        if np is not None:
+            flips = np.asarray(flips, dtype=bool)
+            block = self._contributions[start:start + len(flips)]
+            # Each flip adds 1 to the utility, minus 2 for every contributor it turns off
+            self.utility += int(np.count_nonzero(flips)) - 2 * int(np.count_nonzero(block & flips))
+            block ^= flips
+            if self.journal is not None:
+                self._record(stage, 'contributions', np.flatnonzero(flips) + start)
+            return
+        flipped = []
+        for i, flip in enumerate(flips, start):
+            if flip:
+                self.utility += 1 - 2 * self._contributions[i]
+                self._contributions[i] = 1 - self._contributions[i]
+                flipped.append(i)
+        if self.journal is not None:
+            self._record(stage, 'contributions', flipped)
 
     def coerce(self):
         """Punishes non-contributors to increase utility."""
+        if np is not None:
+            for start, stop in agent_blocks(self.N):
+                punishments = self._punishments[start:stop]
+                newly = (self._contributions[start:stop] == 0) & (punishments != -1)
+                # Going to -1 adds 1 to the utility for an unpunished agent
+                self.utility += int(np.count_nonzero(newly)) + int(punishments[newly].sum(dtype=np.int64))
+                punishments[newly] = -1
+                if self.journal is not None:
+                    self._record('coerce', 'punishments', np.flatnonzero(newly) + start)
+            return
         for i in range(self.N):
-            if self.contributions[i] == 0:
-                self.punishments[i] = -1
+            if self._contributions[i] == 0 and self._punishments[i] != -1:
+                self.set_punishment(i, -1, 'coerce')
+
+# Compact Basilisk for billion-agent runs
+class PackedBasiliskAI(BasiliskAI):
+    """BasiliskAI storing contributions and punishments as one bit per agent.
+
+    Utility is popcount(C) + popcount(P), coercion ORs the inverted contribution words
+    into the punishment words, and phase shifts and shader flips XOR random masks. The
+    running utility is updated from popcounts of just the words each operation touches.
+    """
+    def __init__(self, N=4302, journal=False):
+        self.N = N
+        self._contributions = AgentBitset(N, 1)
+        for start, stop in agent_blocks(N):
+            rand_vals = quantum_random_array(stop - start)
+            self._contributions.xor_block(start, rand_vals > 0.5 if np is not None else [r > 0.5 for r in rand_vals])
+        self._punishments = AgentBitset(N, -1)
+        self.utility = self.recompute_utility()
+        self.journal = [] if journal else None
+
+    @BasiliskAI.contributions.setter
+    def contributions(self, values):
+        previous, self._contributions = self._contributions, self._bitset(values, 1)
+        self._assigned('contributions', previous, self._contributions)
+
+    @BasiliskAI.punishments.setter
+    def punishments(self, values):
+        previous, self._punishments = self._punishments, self._bitset(values, -1)
+        self._assigned('punishments', previous, self._punishments)
+
+    @staticmethod
+    def _bitset(values, value):
+        # Bitsets are adopted as they are, unless they are read-only views
+        if isinstance(values, AgentStates):
+            values = values.values
+        if not isinstance(values, AgentBitset):
+            return AgentBitset.from_values(values, value)
+        return values if isinstance(values.data, bytearray) else values.copy()
+
+    def _assigned(self, field, previous, values):
+        self.utility = self.recompute_utility()
+        if self.journal is not None:
+            self._record('assign', field, previous.changed_agents(values.data))
+
+    def set_contribution(self, i, state, stage='set'):
+        before = self._contributions[i]
+        self._contributions[i] = state
+        delta = self._contributions[i] - before
+        self.utility += delta
+        if delta and self.journal is not None:
+            self._record(stage, 'contributions', [i])
+
+    def set_punishment(self, i, state, stage='set'):
+        before = self._punishments[i]
+        self._punishments[i] = state
+        delta = before - self._punishments[i]
+        self.utility += delta
+        if delta and self.journal is not None:
+            self._record(stage, 'punishments', [i])
+
+    def flip_contributions(self, start, flips, stage='flip'):
+        stop = start + len(flips)
+        before = self._contributions.popcount(start, stop)
+        self._contributions.xor_block(start, flips)
+        self.utility += self._contributions.popcount(start, stop) - before
+        if self.journal is not None:
+            # An XOR changes exactly the flagged agents
+            if np is not None:
+                self._record(stage, 'contributions', np.flatnonzero(np.asarray(flips, dtype=bool)) + start)
+            else:
+                self._record(stage, 'contributions', [i for i, flip in enumerate(flips, start) if flip])
+
+    def coerce(self):
+        """Punishes non-contributors to increase utility."""
+        for start, stop in agent_blocks(self.N):
+            before = self._punishments.popcount(start, stop)
+            snapshot = self._punishments.snapshot(start, stop) if self.journal is not None else None
+            self._punishments.or_not(self._contributions, start, stop)
+            self.utility += self._punishments.popcount(start, stop) - before
+            if snapshot is not None:
+                self._record('coerce', 'punishments',
+                             self._punishments.changed_agents(snapshot, start, stop, base=start // 8))
 
 # Anti-Basilisk mechanisms
+def shader_flips(rand_vals):
+    """Flags the agents whose contribution the shader flips."""
+    # int(rand_val * 2) is odd, and so flips the contribution, only for 0.5 <= rand_val < 1
+    if np is not None:
+        return (rand_vals >= 0.5) & (rand_vals < 1.0)
+    return [0.5 <= rand_val < 1.0 for rand_val in rand_vals]
+
+@metrics.mechanism('self_modifying_shader')
 def self_modifying_shader(basilisk):
     """Modifies contributions using quantum noise."""
-    for i in range(basilisk.N):
-        rand_val = quantum_random()
-        basilisk.contributions[i] = (basilisk.contributions[i] + int(rand_val * 2)) % 2
+    for start, stop in agent_blocks(basilisk.N):
+        basilisk.flip_contributions(start, shader_flips(quantum_random_array(stop - start)), 'shader')
+
+@metrics.mechanism('phase_shift')
+def counterfactual_phase_shift(basilisk, threshold=PHASE_FLIP_THRESHOLD):
+    """Applies phase_shift() to the Basilisk's contributions in place, tracking the utility change."""
+    for start, stop in agent_blocks(basilisk.N):
+        basilisk.flip_contributions(start, phase_flips(quantum_random_array(stop - start), threshold), 'phase_shift')
 
 # Gödelian override (logical paradox)
 def godelian_override():
@@ -277,45 +1665,298 @@ def godelian_override():
     return not G  # True if inconsistent
 
 # Main simulation loop
-def run_simulation():
-    """Runs the Basilisk simulation with quantum noise and anti-Basilisk mechanisms."""
-    basilisk = BasiliskAI()
-    print(f"Initial Utility: {basilisk.compute_utility()}")
+# Outcome of one simulation run; stage_seconds maps each stage to its wall time
+SimulationResult = collections.namedtuple('SimulationResult', [
+    'initial_utility', 'coerced_utility', 'modified_utility', 'final_utility',
+    'timeline', 'utility_deviation', 'collapsed', 'distorted_sample', 'stage_seconds'], defaults=(None,))
 
-    basilisk.coerce()
-    U_coerced = basilisk.compute_utility()
-    print(f"Utility After Coercion: {U_coerced}")
+def simulation_stages(N=4302, packed=False, verbose=True, anxiety=0.7, trust_amplitude=1.0,
+                      flip_threshold=PHASE_FLIP_THRESHOLD, graph=None, spread_rounds=1):
+    """Runs the simulation one stage at a time.
 
-    self_modifying_shader(basilisk)
-    print(f"Utility After Self-Modification: {basilisk.compute_utility()}")
+    Before each stage the generator yields the number of noise draws the stage will
+    make; its return value is the SimulationResult. `anxiety`, `trust_amplitude` and
+    `flip_threshold` are passed to seed_reality(), inject_trust() and the phase shift.
+    With an agent_graph.AgentGraph as `graph`, coercion spreads over it for
+    `spread_rounds` rounds after coerce(), and trust after the phase shift.
+    """
+    say = print if verbose else (lambda *args: None)
+    stage = metrics.StageTimer()
+    yield N
+    with stage('initialize'):
+        basilisk = PackedBasiliskAI(N) if packed else BasiliskAI(N)
+        U_initial = basilisk.compute_utility()
+    say(f"Initial Utility: {U_initial}")
 
-    basilisk.contributions = phase_shift(basilisk.contributions, basilisk.N)
-    final_utility = basilisk.compute_utility()
-    print(f"Utility After Phase Shift: {final_utility}")
+    with stage('coerce'):
+        basilisk.coerce()
+        U_coerced = basilisk.compute_utility()
+    say(f"Utility After Coercion: {U_coerced}")
+    if graph is not None:
+        import agent_graph  # Imports this module, so only on demand
+        with stage('coercion_spread'):
+            agent_graph.spread_coercion(basilisk, graph, spread_rounds)
+            U_coerced = basilisk.compute_utility()
+        say(f"Utility After Coercion Spread: {U_coerced}")
 
-    new_timeline = seed_reality()
-    print(f"New Timeline: {new_timeline}")
+    yield N
+    with stage('self_modifying_shader'):
+        self_modifying_shader(basilisk)
+        U_modified = basilisk.compute_utility()
+    say(f"Utility After Self-Modification: {U_modified}")
 
-    fear_signal = [1] * basilisk.N
-    trust_signal = inject_trust(fear_signal, basilisk.N)
-    distorted_signal = refractive_distortion(trust_signal, basilisk.N)
-    print(f"Distorted Signal Sample: {distorted_signal[:5]}...")
+    yield N
+    with stage('phase_shift'):
+        counterfactual_phase_shift(basilisk, flip_threshold)
+        final_utility = basilisk.compute_utility()
+    say(f"Utility After Phase Shift: {final_utility}")
+    if graph is not None:
+        with stage('trust_spread'):
+            agent_graph.spread_trust(basilisk, graph, spread_rounds)
+            final_utility = basilisk.compute_utility()
+        say(f"Utility After Trust Spread: {final_utility}")
+
+    yield 1
+    with stage('seed_reality'):
+        new_timeline = seed_reality(anxiety=anxiety)
+    say(f"New Timeline: {new_timeline}")
+
+    yield N
+    # The signal is carried one block at a time in a reused buffer; only the sample is kept
+    distorted_sample = []
+    block_signal = signal_engine.signal_array(min(N, AGENT_BLOCK))
+    for start, stop in agent_blocks(N):
+        n = stop - start
+        with stage('trust_injection'):
+            trust_signal = inject_trust(signal_engine.signal_array(n, out=block_signal), n, trust_amplitude)
+        with stage('refractive_distortion'):
+            distorted_signal = refractive_distortion(trust_signal, n)
+        distorted_sample += distorted_signal[:5 - len(distorted_sample)].tolist()
+    say(f"Distorted Signal Sample: {distorted_sample}...")
 
     # Check for collapse based on deviation from coerced utility
     utility_deviation = abs(final_utility - U_coerced)
-    if utility_deviation > basilisk.N * 0.5:
-        print(f"Basilisk Collapses: Quantum noise caused significant deviation ({utility_deviation})!")
+    collapsed = utility_deviation > basilisk.N * 0.5
+    if collapsed:
+        say(f"Basilisk Collapses: Quantum noise caused significant deviation ({utility_deviation})!")
     else:
-        print(f"Basilisk Persists: Utility deviation ({utility_deviation}) within acceptable range.")
+        say(f"Basilisk Persists: Utility deviation ({utility_deviation}) within acceptable range.")
 
     # Apply Gödelian override
     if godelian_override():
-        print("Gödelian Override: Applied - Logical paradox introduced.")
-        print("Basilisk Collapses: Logical inconsistency detected!")
+        say("Gödelian Override: Applied - Logical paradox introduced.")
+        say("Basilisk Collapses: Logical inconsistency detected!")
+    else:
+        say("Gödelian Override: Not applied.")
+
+    return SimulationResult(U_initial, U_coerced, U_modified, final_utility, new_timeline,
+                            utility_deviation, collapsed, distorted_sample, dict(stage.seconds))
+
+def run_simulation(N=4302, packed=False, verbose=True, anxiety=0.7, trust_amplitude=1.0,
+                   flip_threshold=PHASE_FLIP_THRESHOLD, graph=None, spread_rounds=1):
+    """Runs the Basilisk simulation with quantum noise and anti-Basilisk mechanisms.
+
+    Returns a SimulationResult, including the wall time of every stage; each stage's
+    outcome is also printed when `verbose` is set. The remaining parameters are those
+    of simulation_stages().
+    """
+    stages = simulation_stages(N, packed, verbose, anxiety, trust_amplitude, flip_threshold, graph, spread_rounds)
+    while True:
+        try:
+            next(stages)
+        except StopIteration as done:
+            return done.value
+
+async def run_simulation_async(N=4302, packed=False, verbose=True, anxiety=0.7, trust_amplitude=1.0,
+                               flip_threshold=PHASE_FLIP_THRESHOLD, graph=None, spread_rounds=1):
+    """Awaitable run_simulation() for sharing one event loop and one entropy pool.
+
+    The noise for each stage is awaited before the stage runs, and the task yields to
+    the loop between stages. A stage itself runs synchronously, drawing from its
+    prefetched NoiseBuffer. The buffer is set in a context variable rather than
+    replacing the module's pool, so concurrent simulations and other threads never
+    see each other's noise.
+    """
+    import asyncio
+    stages = simulation_stages(N, packed, verbose, anxiety, trust_amplitude, flip_threshold, graph, spread_rounds)
+    draws = next(stages)
+    while True:
+        values = await _take_async(draws)  # Counted as the stage draws them
+        token = _stage_noise.set(NoiseBuffer(values, entropy_pool))
+        try:
+            draws = stages.send(None)
+        except StopIteration as done:
+            return done.value
+        finally:
+            _stage_noise.reset(token)
+        await asyncio.sleep(0)
+
+def run_simulation_streaming(N=4302, chunk=AGENT_BLOCK, storage=None, verbose=True, anxiety=0.7,
+                             trust_amplitude=1.0, flip_threshold=PHASE_FLIP_THRESHOLD):
+    """Runs the simulation out of core, carrying `chunk` agents at a time through every stage.
+
+    Each chunk is created, coerced, shaded, phase shifted and distorted before the next
+    one is drawn, and only running per-stage utility totals are kept, so memory does not
+    grow with N. With `storage`, a directory, the final contributions and punishments
+    are written there as int8 files (NumPy memmaps when available), and the population
+    is limited by disk rather than RAM. Agents draw their noise chunk by chunk, so the
+    draws are not in the same order as run_simulation().
+    """
+    say = print if verbose else (lambda *args: None)
+    files = None
+    if storage is not None:
+        os.makedirs(storage, exist_ok=True)
+        names = [os.path.join(storage, name) for name in ('contributions.i8', 'punishments.i8')]
+        if np is not None:
+            files = [np.memmap(name, dtype=np.int8, mode='w+', shape=(max(N, 1),)) for name in names]
+        else:
+            files = [open(name, 'wb') for name in names]
+
+    U_initial = U_coerced = U_modified = final_utility = 0
+    distorted_sample = []
+    stage = metrics.StageTimer()  # Times add up over the chunks
+    try:
+        for start, stop in agent_blocks(N, chunk):
+            n = stop - start
+            with stage('initialize'):
+                basilisk = BasiliskAI(n)
+                U_initial += basilisk.compute_utility()
+            with stage('coerce'):
+                basilisk.coerce()
+                U_coerced += basilisk.compute_utility()
+            with stage('self_modifying_shader'):
+                self_modifying_shader(basilisk)
+                U_modified += basilisk.compute_utility()
+            with stage('phase_shift'):
+                counterfactual_phase_shift(basilisk, flip_threshold)
+                final_utility += basilisk.compute_utility()
+
+            with stage('trust_injection'):
+                trust_signal = inject_trust(signal_engine.signal_array(n), n, trust_amplitude)
+            with stage('refractive_distortion'):
+                distorted_signal = refractive_distortion(trust_signal, n)
+            distorted_sample += distorted_signal[:5 - len(distorted_sample)].tolist()
+
+            if files is not None:
+                with stage('storage'):
+                    for f, values in zip(files, (basilisk._contributions, basilisk._punishments)):
+                        if np is not None:
+                            f[start:stop] = values
+                        else:
+                            f.write(array('b', values).tobytes())
+    finally:
+        for f in files or ():
+            if np is not None:
+                f.flush()
+            else:
+                f.close()
+
+    say(f"Initial Utility: {U_initial}")
+    say(f"Utility After Coercion: {U_coerced}")
+    say(f"Utility After Self-Modification: {U_modified}")
+    say(f"Utility After Phase Shift: {final_utility}")
+    with stage('seed_reality'):
+        new_timeline = seed_reality(anxiety=anxiety)
+    say(f"New Timeline: {new_timeline}")
+    say(f"Distorted Signal Sample: {distorted_sample}...")
+
+    utility_deviation = abs(final_utility - U_coerced)
+    collapsed = utility_deviation > N * 0.5
+    if collapsed:
+        say(f"Basilisk Collapses: Quantum noise caused significant deviation ({utility_deviation})!")
+    else:
+        say(f"Basilisk Persists: Utility deviation ({utility_deviation}) within acceptable range.")
+    if godelian_override():
+        say("Gödelian Override: Applied - Logical paradox introduced.")
+        say("Basilisk Collapses: Logical inconsistency detected!")
     else:
-        print("Gödelian Override: Not applied.")
+        say("Gödelian Override: Not applied.")
+
+    return SimulationResult(U_initial, U_coerced, U_modified, final_utility, new_timeline,
+                            utility_deviation, collapsed, distorted_sample, dict(stage.seconds))
+
+def main(argv=None):
+    """Command-line entry point: applies the capture options and runs the simulation."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Basilisk simulation disrupted by microphone quantum noise.")
+    parser.add_argument('device', nargs='?', type=int,
+                        help="microphone index to capture from (prompts for one if omitted)")
+    parser.add_argument('-N', '--agents', type=int, default=4302, help="number of agents (default: 4302)")
+    parser.add_argument('--packed', action='store_true', help="store agents as one bit each")
+    parser.add_argument('--chunk', type=int, metavar='AGENTS',
+                        help="stream agents through all stages this many at a time")
+    parser.add_argument('--storage', metavar='DIR',
+                        help="with --chunk, write the final agent arrays to DIR instead of keeping them")
+    parser.add_argument('--graph', metavar='PATH',
+                        help="spread coercion and trust over the agent graph saved at PATH")
+    parser.add_argument('--spread-rounds', type=int, default=1, metavar='ROUNDS',
+                        help="influence rounds per spread stage with --graph (default: 1)")
+    parser.add_argument('--all-devices', action='store_true',
+                        help="capture from every working microphone at once")
+    parser.add_argument('--merge', choices=MERGE_MODES, default='interleave',
+                        help="how bits from several microphones are combined (default: interleave)")
+    parser.add_argument('--recording', metavar='PATH',
+                        help="WAV or raw 16-bit capture to use when no microphone works")
+    parser.add_argument('--dump', metavar='PATH',
+                        help="append captures to PATH for later replay instead of simulating")
+    parser.add_argument('--dump-kind', choices=DUMP_KINDS, default='raw',
+                        help="dump raw samples or converted noise values (default: raw)")
+    parser.add_argument('--dump-seconds', type=float, default=RECORD_SECONDS,
+                        help=f"seconds of audio to dump (default: {RECORD_SECONDS:g})")
+    parser.add_argument('--replay', metavar='PATH', help="draw all noise from a dump file")
+    parser.add_argument('--replay-offset', type=int, default=0, metavar='N',
+                        help="skip the first N values of the replayed dump")
+    parser.add_argument('--daemon', metavar='SOCKET', nargs='?', const='',
+                        help="draw all noise from a running entropy daemon (default socket if none given)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="record instrumentation and save it to PATH (Prometheus text for .prom, else JSON)")
+    args = parser.parse_args(argv)
+    if args.graph and (args.chunk or args.storage):
+        parser.error("--graph needs every agent in memory and cannot be combined with --chunk or --storage")
+    graph = None
+    if args.graph:
+        import agent_graph  # Imports this module, so only on demand
+        try:
+            graph = agent_graph.AgentGraph.load(args.graph)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"Could not load agent graph: {e}\n")
+        if graph.N != args.agents:
+            parser.exit(1, f"{args.graph} has {graph.N} agents, not {args.agents}.\n")
+    if args.metrics:
+        metrics.enable()
+    configure(device=args.device, interactive=args.device is None and not args.all_devices,
+              all_devices=args.all_devices, merge=args.merge, recording=args.recording)
+    if args.dump:
+        dump = CaptureDump(args.dump, args.dump_kind)
+        for _ in range(max(round(args.dump_seconds / RECORD_SECONDS), 1)):
+            get_quantum_noise_from_microphones(dump)
+        print(f"Dumped {dump.values} noise values to {args.dump}.")
+        if args.metrics:
+            metrics.write(args.metrics)
+        return
+    if args.replay:
+        set_entropy_source(ReplaySource(args.replay, args.replay_offset))
+    elif args.daemon is not None:
+        import entropy_daemon  # Imports this module, so only on demand
+        try:
+            entropy_daemon.use_entropy_daemon(args.daemon or entropy_daemon.DAEMON_SOCKET)
+        except OSError as e:
+            parser.exit(1, f"No entropy daemon at {args.daemon or entropy_daemon.DAEMON_SOCKET}: {e}\n")
+    try:
+        if args.chunk or args.storage:
+            result = run_simulation_streaming(args.agents, args.chunk or AGENT_BLOCK, args.storage)
+        else:
+            result = run_simulation(args.agents, packed=args.packed, graph=graph, spread_rounds=args.spread_rounds)
+    except EntropySourceError as e:
+        parser.exit(1, f"{e}\n")
+    if args.metrics:
+        metrics.write(args.metrics)
+        print(f"Stage times: {', '.join(f'{name} {seconds:.3f} s' for name, seconds in result.stage_seconds.items())}")
+        print(f"Saved metrics to {args.metrics}.")
 
 # Run the simulation
 if __name__ == "__main__":
-    run_simulation()
+    # Helper modules import this one by name; let them share this copy instead of loading a second
+    sys.modules.setdefault('microphone_quantum_basilisk', sys.modules[__name__])
+    main()
 
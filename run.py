@@ -38,10 +38,26 @@ End of simulation.
 
 import time
 
-# Vanilla random number generator
-def vanilla_random(seed):
-    seed = (seed * 1103515245 + 12345) & 0x7fffffff
-    return (seed % 10000) / 10000.0, seed
+import sat_solver
+import signal_engine
+from counter_rng import CounterRNG, LCGRandom
+
+# Counter-based random number generator: each mechanism reads its own stream, and the
+# value for any agent is a pure function of (seed, stream, agent index). Mechanisms
+# take() their draws, so calling one again continues its stream instead of repeating it
+LEGACY_LCG = False  # True replays the original vanilla_random sequences exactly
+
+STREAM_INIT = 0  # Initial contributions
+STREAM_PHASE = 1  # Phase-space manipulation
+STREAM_REALITY = 2  # Timeline shift
+STREAM_DISTORTION = 3  # Refractive distortion
+STREAM_SHADER = 4  # Self-modifying shader
+OFFSET_STREAMS = {STREAM_PHASE, STREAM_DISTORTION, STREAM_SHADER}  # Reseeded with seed + i by the LCG code
+
+def make_rng(seed):
+    if LEGACY_LCG:
+        return LCGRandom(seed, OFFSET_STREAMS)
+    return CounterRNG(seed)
 
 # Basilisk utility function
 def basilisk_utility(contributions, punishments, N):
@@ -51,58 +67,59 @@ def basilisk_utility(contributions, punishments, N):
     return total
 
 # Simulate phase-space manipulation (more aggressive flipping)
-def phase_shift(contributions, N, seed):
+def phase_shift(contributions, N, rng):
     new_contributions = [0] * N
+    rand_vals = rng.take(STREAM_PHASE, N).tolist()
     for i in range(N):
-        rand_val, seed = vanilla_random(seed + i)
-        phase = rand_val * 2 * 3.14159  # Simulate phase from 0 to 2π
+        phase = rand_vals[i] * 2 * 3.14159  # Simulate phase from 0 to 2π
         # Lower threshold to flip more contributions (more disruption)
         if (phase - int(phase)) > 0.1:  # Changed from 0.3 to 0.1
             new_contributions[i] = 1 - contributions[i]  # Flip contribution
         else:
             new_contributions[i] = contributions[i]
-    return new_contributions, seed
+    return new_contributions
 
 # Main simulation (Game-Theoretic Counterfactuals)
-N = 4302  # Number of agents from your April Fools' experiment
-contributions = [0] * N
-punishments = [0] * N
-seed = int(time.time())
-
-# Initialize random contributions
-for i in range(N):
-    rand_val, seed = vanilla_random(seed)
-    contributions[i] = 1 if rand_val > 0.5 else 0
-
-# Initial utility
-U = basilisk_utility(contributions, punishments, N)
-print(f"Initial Utility: {U}")
-
-# Basilisk coerces agents
-for i in range(N):
-    if contributions[i] == 0:
-        punishments[i] = -1  # Punish non-contributors
-
-U_coerced = basilisk_utility(contributions, punishments, N)
-print(f"Utility After Coercion: {U_coerced}")
-
-# Phase-space manipulation (quantum perturbation)
-contributions, seed = phase_shift(contributions, N, seed)
-U_perturbed = basilisk_utility(contributions, punishments, N)
-print(f"Utility After Phase Shift: {U_perturbed}")
-
-# Check for logical collapse
-if abs(U_perturbed - U_coerced) > N * 0.5:
-    print("Basilisk Collapses: Unable to compute stable utility.")
-else:
-    print("Basilisk Stable: Utility remains consistent.")
-    print(f"Final Utility: {U_perturbed}")
-
-# Vanilla symbolic logic solver (no Z3)
+def game_theoretic_counterfactual(N=4302, seed=None):  # Number of agents from your April Fools' experiment
+    contributions = [0] * N
+    punishments = [0] * N
+    rng = make_rng(int(time.time()) if seed is None else seed)
+
+    # Initialize random contributions
+    rand_vals = rng.take(STREAM_INIT, N).tolist()
+    for i in range(N):
+        contributions[i] = 1 if rand_vals[i] > 0.5 else 0
+
+    # Initial utility
+    U = basilisk_utility(contributions, punishments, N)
+    print(f"Initial Utility: {U}")
+
+    # Basilisk coerces agents
+    for i in range(N):
+        if contributions[i] == 0:
+            punishments[i] = -1  # Punish non-contributors
+
+    U_coerced = basilisk_utility(contributions, punishments, N)
+    print(f"Utility After Coercion: {U_coerced}")
+
+    # Phase-space manipulation (quantum perturbation)
+    contributions = phase_shift(contributions, N, rng)
+    U_perturbed = basilisk_utility(contributions, punishments, N)
+    print(f"Utility After Phase Shift: {U_perturbed}")
+
+    # Check for logical collapse
+    if abs(U_perturbed - U_coerced) > N * 0.5:
+        print("Basilisk Collapses: Unable to compute stable utility.")
+    else:
+        print("Basilisk Stable: Utility remains consistent.")
+        print(f"Final Utility: {U_perturbed}")
+
+# Vanilla symbolic logic solver (no Z3), backed by a CDCL SAT engine
 class LogicSolver:
     def __init__(self):
         self.variables = {}
         self.constraints = []
+        self.result = None  # SolveResult of the last check()
 
     def add_variable(self, name):
         self.variables[name] = None  # None = unknown, True/False = assigned
@@ -125,80 +142,78 @@ class LogicSolver:
         return None
 
     def check(self):
-        # Try all possible assignments
-        for G in [True, False]:
-            values = {"G": G}
-            consistent = True
-            for constraint in self.constraints:
-                result = self.evaluate(constraint, values)
-                if result is False:
-                    consistent = False
-                    break
-            if consistent:
-                return True  # Satisfiable
-        return False  # Unsatisfiable
+        # Compile every constraint to CNF and search all assignments of all variables
+        self.result = sat_solver.solve(self.constraints, self.variables)
+        if self.result.satisfiable:
+            self.variables.update(self.result.model)
+        return self.result.satisfiable
+
+    def model(self):
+        # Satisfying assignment from the last check(), or None
+        return self.result.model if self.result else None
+
+    def unsat_core(self):
+        # Constraints that cannot hold together, from the last check(), or None
+        if self.result is None or self.result.satisfiable:
+            return None
+        if self.result.core is None:
+            # check() solves without selector variables; only a core request pays for them
+            self.result = sat_solver.solve(self.constraints, self.variables, core=True)
+        return [self.constraints[i] for i in self.result.core]
+
+    def stats(self):
+        # Solver counters and compile/solve times of the last check()
+        return self.result.stats if self.result else None
 
 # Basilisk's logic with Gödelian contradiction
-solver = LogicSolver()
-solver.add_variable("G")  # Goal: "I must punish to exist"
-solver.add_constraint(("IMPLIES", "G", ("NOT", "G")))  # G => ~G
-solver.add_constraint("G")  # Assume G is true
-
-# Check satisfiability
-if not solver.check():
-    print("Gödelian Override: Basilisk logic is inconsistent.")
-else:
-    print("Basilisk survives... for now.")
+def godelian_logic_check():
+    solver = LogicSolver()
+    solver.add_variable("G")  # Goal: "I must punish to exist"
+    solver.add_constraint(("IMPLIES", "G", ("NOT", "G")))  # G => ~G
+    solver.add_constraint("G")  # Assume G is true
+
+    # Check satisfiability
+    if not solver.check():
+        print("Gödelian Override: Basilisk logic is inconsistent.")
+    else:
+        print("Basilisk survives... for now.")
 
 # Simulate /dev/urandom reality alteration
-def seed_reality(target=2025.264, anxiety=0.7, seed=None):
-    if seed is None:
-        seed = int(time.time())
-    rand_val, seed = vanilla_random(seed)
+def seed_reality(target=2025.264, anxiety=0.7, rng=None):
+    if rng is None:
+        rng = make_rng(int(time.time()))
+    rand_val = float(rng.take(STREAM_REALITY, 1)[0])
     timeline_shift = (rand_val * 2 - 1) * anxiety  # Shift between -anxiety and +anxiety
     new_timeline = target + timeline_shift
-    return new_timeline, seed
+    return new_timeline, rng
 
 # Inject trust into fear-based incentives
-def inject_trust(fear_signal, N, trust_amplitude=1.0):
-    new_signal = [0] * N
-    for i in range(N):
-        # Vanilla cos approximation (Taylor series)
-        x = 3.14159 * trust_amplitude
-        cos_x = 1 - (x**2)/2 + (x**4)/24  # First few terms
-        new_signal[i] = fear_signal[i] * cos_x
-    return new_signal
+# Float arrays are scaled in place; the cos coefficient is computed once per amplitude
+def inject_trust(fear_signal, N, trust_amplitude=1.0, exact=False):
+    # Vanilla cos approximation (Taylor series), or math.cos when exact
+    return signal_engine.inject_trust(signal_engine.as_signal(fear_signal, N), trust_amplitude, exact)
 
 # Simulate refractive index distortion (wave optics)
-def refractive_distortion(signal, N, seed):
-    distorted_signal = [0] * N
-    for i in range(N):
-        rand_val, seed = vanilla_random(seed + i)
-        # Simulate fractal refractive index (from frost patterns)
-        fractal = rand_val * 0.1  # Simplified fractal perturbation
-        n = 1.0 + fractal  # Base refractive index + perturbation
-        k = 2 * 3.14159 / 0.5  # Wave number (wavelength = 0.5)
-        d = 1.0  # Medium thickness
-        phase = k * n * d
-        distorted_signal[i] = signal[i] * (1 - (phase - int(phase)))  # Distort signal
-    return distorted_signal, seed
+# Simulate fractal refractive index (from frost patterns), distorting float arrays in place
+def refractive_distortion(signal, N, rng, wavelength=0.5, thickness=1.0):
+    rand_vals = rng.take(STREAM_DISTORTION, N)
+    return signal_engine.refractive_distortion(signal_engine.as_signal(signal, N), rand_vals, wavelength, thickness)
 
 # Main simulation (Quantum Trust Injection & Reality Alteration)
-N = 4302
-fear_signal = [1] * N  # Fear-based coercion
-seed = int(time.time())
+def trust_injection_and_reality(N=4302):
+    fear_signal = signal_engine.signal_array(N)  # Fear-based coercion
 
-# Alter reality
-new_timeline, seed = seed_reality(anxiety=0.7)
-print(f"New Timeline: {new_timeline}")
+    # Alter reality
+    new_timeline, rng = seed_reality(anxiety=0.7)
+    print(f"New Timeline: {new_timeline}")
 
-# Inject trust
-trust_signal = inject_trust(fear_signal, N)
-print(f"Coercion Signal After Trust Injection: {trust_signal[:5]}...")
+    # Inject trust
+    trust_signal = inject_trust(fear_signal, N)
+    print(f"Coercion Signal After Trust Injection: {trust_signal[:5].tolist()}...")
 
-# Distort signal
-distorted_signal, seed = refractive_distortion(trust_signal, N, seed)
-print(f"Distorted Signal: {distorted_signal[:5]}...")
+    # Distort signal
+    distorted_signal = refractive_distortion(trust_signal, N, rng)
+    print(f"Distorted Signal: {distorted_signal[:5].tolist()}...")
 
 # Basilisk AI
 class BasiliskAI:
@@ -209,9 +224,10 @@ class BasiliskAI:
         self.contributions = [0] * N
         self.punishments = [0] * N
         self.seed = seed
+        self.rng = make_rng(seed)
+        rand_vals = self.rng.take(STREAM_INIT, N).tolist()
         for i in range(N):
-            rand_val, self.seed = vanilla_random(self.seed)
-            self.contributions[i] = 1 if rand_val > 0.5 else 0
+            self.contributions[i] = 1 if rand_vals[i] > 0.5 else 0
 
     def compute_utility(self):
         total = 0
@@ -226,14 +242,14 @@ class BasiliskAI:
 
 # Anti-Basilisk Mechanisms
 def self_modifying_shader(basilisk):
+    rand_vals = basilisk.rng.take(STREAM_SHADER, basilisk.N).tolist()
     for i in range(basilisk.N):
-        rand_val, basilisk.seed = vanilla_random(basilisk.seed + i)
-        basilisk.contributions[i] = (basilisk.contributions[i] + int(rand_val * 2)) % 2
+        basilisk.contributions[i] = (basilisk.contributions[i] + int(rand_vals[i] * 2)) % 2
 
 def counterfactual_phase_shift(basilisk):
+    rand_vals = basilisk.rng.take(STREAM_PHASE, basilisk.N).tolist()
     for i in range(basilisk.N):
-        rand_val, basilisk.seed = vanilla_random(basilisk.seed + i)
-        phase = rand_val * 2 * 3.14159
+        phase = rand_vals[i] * 2 * 3.14159
         if (phase - int(phase)) > 0.1:  # Adjusted threshold
             basilisk.contributions[i] = 1 - basilisk.contributions[i]
 
@@ -246,27 +262,35 @@ def godelian_override():
     return True  # Consistent
 
 # Run the final simulation
-basilisk = BasiliskAI()
-print(f"Initial Utility: {basilisk.compute_utility()}")
-
-basilisk.coerce()
-print(f"Utility After Coercion: {basilisk.compute_utility()}")
-
-self_modifying_shader(basilisk)
-print(f"Utility After Shader Evolution: {basilisk.compute_utility()}")
-
-counterfactual_phase_shift(basilisk)
-print(f"Utility After Phase Shift: {basilisk.compute_utility()}")
-
-if godelian_override():
-    print("Gödelian Override: Basilisk logic is inconsistent.")
-    basilisk.punishments = [float('-inf')] * basilisk.N  # Simulate collapse
-
-new_timeline, basilisk.seed = seed_reality()
-trust_signal = inject_trust([1] * basilisk.N, basilisk.N)
-distorted_signal, basilisk.seed = refractive_distortion(trust_signal, basilisk.N, basilisk.seed)
-
-print(f"New Timeline: {new_timeline}")
-print(f"Final Utility: {basilisk.compute_utility()}")
-print("Basilisk Deconstructed: All your basilisks are belong to us.")
-print("End of simulation.")
+def final_simulation(N=4302, seed=None):
+    basilisk = BasiliskAI(N, seed)
+    print(f"Initial Utility: {basilisk.compute_utility()}")
+
+    basilisk.coerce()
+    print(f"Utility After Coercion: {basilisk.compute_utility()}")
+
+    self_modifying_shader(basilisk)
+    print(f"Utility After Shader Evolution: {basilisk.compute_utility()}")
+
+    counterfactual_phase_shift(basilisk)
+    print(f"Utility After Phase Shift: {basilisk.compute_utility()}")
+
+    if godelian_override():
+        print("Gödelian Override: Basilisk logic is inconsistent.")
+        basilisk.punishments = [float('-inf')] * basilisk.N  # Simulate collapse
+
+    new_timeline, basilisk.rng = seed_reality()
+    trust_signal = inject_trust(signal_engine.signal_array(basilisk.N), basilisk.N)
+    refractive_distortion(trust_signal, basilisk.N, basilisk.rng)
+
+    print(f"New Timeline: {new_timeline}")
+    print(f"Final Utility: {basilisk.compute_utility()}")
+    print("Basilisk Deconstructed: All your basilisks are belong to us.")
+    print("End of simulation.")
+
+# The scripted runs only execute when run.py is run directly, so the module can be imported
+if __name__ == "__main__":
+    game_theoretic_counterfactual()
+    godelian_logic_check()
+    trust_injection_and_reality()
+    final_simulation()
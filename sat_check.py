@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Brute-Force Check of the SAT Engine
+#
+# Generates random LogicSolver constraints over a handful of variables and compares
+# sat_solver.solve(), with and without an unsat core, against an exhaustive search over
+# every assignment: satisfiability must agree, a reported model must satisfy every
+# constraint, and a reported core must itself be unsatisfiable. Formulas come from a seeded generator, so a failing case
+# can be replayed with the same --seed.
+
+import argparse
+import itertools
+import random
+import sys
+
+import sat_solver
+
+FORMULAS = 3000
+VARIABLES = 5
+MAX_CONSTRAINTS = 6
+MAX_DEPTH = 3
+SEED = 4302
+
+def random_expr(rng, names, depth):
+    """Returns a random constraint over `names`, nested at most `depth` operators deep."""
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(names) if rng.random() < 0.95 else rng.random() < 0.5
+    op = rng.choice(("NOT", "IMPLIES", "AND", "OR", "IFF"))
+    if op == "NOT":
+        return ("NOT", random_expr(rng, names, depth - 1))
+    if op in ("AND", "OR"):
+        return (op,) + tuple(random_expr(rng, names, depth - 1) for _ in range(rng.randint(1, 3)))
+    return (op, random_expr(rng, names, depth - 1), random_expr(rng, names, depth - 1))
+
+def evaluate(expr, model):
+    """Evaluates a constraint under a mapping of variable names to booleans."""
+    if isinstance(expr, bool):
+        return expr
+    if isinstance(expr, str):
+        return model[expr]
+    op, args = expr[0], expr[1:]
+    if op == "NOT":
+        return not evaluate(args[0], model)
+    if op == "IMPLIES":
+        return not evaluate(args[0], model) or evaluate(args[1], model)
+    if op == "AND":
+        return all(evaluate(arg, model) for arg in args)
+    if op == "OR":
+        return any(evaluate(arg, model) for arg in args)
+    if op == "IFF":
+        return evaluate(args[0], model) == evaluate(args[1], model)
+    raise ValueError(f"Unknown operator {op!r} in constraint {expr!r}.")
+
+def brute_force(constraints, names):
+    """Returns whether some assignment of `names` satisfies every constraint."""
+    return any(all(evaluate(expr, dict(zip(names, values))) for expr in constraints)
+               for values in itertools.product((False, True), repeat=len(names)))
+
+def check(constraints, names, expected):
+    """Compares the solver with the brute-force answer; returns a description of the mismatch, or None."""
+    plain = sat_solver.solve(constraints, names)
+    if plain.satisfiable != expected:
+        return f"solver without a core says satisfiable={plain.satisfiable}, brute force says {expected}"
+    result = sat_solver.solve(constraints, names, core=True)
+    if result.satisfiable != expected:
+        return f"solver says satisfiable={result.satisfiable}, brute force says {expected}"
+    if result.satisfiable:
+        failed = [i for i, expr in enumerate(constraints) if not evaluate(expr, result.model)]
+        if failed:
+            return f"model {result.model} violates constraints {failed}"
+    elif brute_force([constraints[i] for i in result.core], names):
+        return f"core {result.core} is satisfiable"
+    return None
+
+def run_checks(formulas=FORMULAS, variables=VARIABLES, seed=SEED):
+    """Checks `formulas` random problems; returns the number of mismatches found."""
+    rng = random.Random(seed)
+    names = [f"x{i}" for i in range(variables)]
+    counts = {True: 0, False: 0}
+    mismatches = 0
+    for case in range(formulas):
+        constraints = [random_expr(rng, names, MAX_DEPTH) for _ in range(rng.randint(1, MAX_CONSTRAINTS))]
+        expected = brute_force(constraints, names)
+        counts[expected] += 1
+        problem = check(constraints, names, expected)
+        if problem is not None:
+            mismatches += 1
+            print(f"Case {case}: {problem}\n  constraints: {constraints!r}")
+    print(f"Checked {formulas} formulas ({counts[True]} satisfiable, {counts[False]} unsatisfiable): "
+          f"{mismatches} mismatch(es)")
+    return mismatches
+
+def main(argv=None):
+    """Command-line entry point: exits with status 1 if any formula disagrees with brute force."""
+    parser = argparse.ArgumentParser(description="Check the SAT engine against brute force on random formulas.")
+    parser.add_argument('-n', '--formulas', type=int, default=FORMULAS, help=f"formulas to check (default: {FORMULAS})")
+    parser.add_argument('-v', '--variables', type=int, default=VARIABLES,
+                        help=f"variables per formula (default: {VARIABLES})")
+    parser.add_argument('--seed', type=int, default=SEED, help=f"generator seed (default: {SEED})")
+    args = parser.parse_args(argv)
+    sys.exit(1 if run_checks(args.formulas, args.variables, args.seed) else 0)
+
+if __name__ == "__main__":
+    main()
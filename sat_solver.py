@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+# SAT Engine for the Basilisk Logic Solver
+#
+# Constraints are nested tuples over variable names, as used by run.py's LogicSolver:
+# "G", ("NOT", e), ("IMPLIES", a, b), plus ("AND", ...), ("OR", ...) and ("IFF", a, b).
+# They are compiled once to CNF (Tseitin encoding, sharing repeated subformulas) and
+# solved by conflict-driven clause learning: DPLL search with two-watched-literal unit
+# propagation, first-UIP learning with clause minimization, VSIDS branching, phase
+# saving, Luby restarts and periodic deletion of the learned clauses that span the most
+# decision levels (LBD). When an unsat core is requested, every constraint is guarded by
+# a selector variable assumed true, so an unsatisfiable problem reports the subset of
+# constraints that conflict.
+
+import collections
+import time
+
+RESTART_BASE = 100  # Conflicts in the first restart interval, scaled by the Luby sequence
+ACTIVITY_DECAY = 0.95
+ACTIVITY_LIMIT = 1e100  # Activities are rescaled past this to stay in float range
+REDUCE_BASE = 2000  # Conflicts before the first learned-clause reduction
+REDUCE_STEP = 300  # Growth of the interval between reductions
+GLUE_LBD = 2  # Learned clauses spanning at most this many decision levels are never deleted
+
+# Outcome of SATFormula.solve(): model maps variable names to booleans (None if
+# unsatisfiable); core lists the indices of conflicting constraints (None if satisfiable
+# or if the formula was built without a core)
+SolveResult = collections.namedtuple('SolveResult', ['satisfiable', 'model', 'core', 'stats'])
+
+def luby(i):
+    """The i-th term (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ..."""
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i %= size
+    return 1 << seq
+
+def _watch(lit):
+    # Index of a literal's watch list: 2v for v, 2v + 1 for -v
+    return lit << 1 if lit > 0 else (-lit) << 1 | 1
+
+class SATSolver:
+    """CDCL solver over integer literals: v is variable v true, -v is it false."""
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []  # Lists of literals, the first two watched; None once deleted
+        self.learnts = {}  # Learned clause index -> LBD (decision levels it spans when learned)
+        self.watches = [[], []]
+        self.assign = [0]  # Per variable: 1 true, -1 false, 0 unassigned
+        self.level = [0]
+        self.reason = [None]  # Index of the clause that implied the variable
+        self.activity = [0.0]
+        self.phase = [False]  # Saved polarity, reused when the variable is decided again
+        self.trail = []
+        self.trail_lim = []  # Trail length at the start of each decision level
+        self.qhead = 0
+        self.ok = True  # False once the clauses are unsatisfiable without assumptions
+        self.model = None
+        self.core = None
+        self.stats = collections.Counter()
+        self._var_inc = 1.0
+        self._heap = []  # Binary max-heap of variables by activity
+        self._heap_index = [-1]  # Per variable: position in _heap, -1 if not in it
+        self._seen = [False]
+        self._next_reduce = REDUCE_BASE
+
+    def new_var(self):
+        self.num_vars += 1
+        v = self.num_vars
+        self.watches += [[], []]
+        self.assign.append(0)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self._seen.append(False)
+        self._heap_index.append(-1)
+        self._heap_insert(v)
+        return v
+
+    def value(self, lit):
+        """1 if the literal is true, -1 if false, 0 if unassigned."""
+        a = self.assign[abs(lit)]
+        return a if lit > 0 else -a
+
+    def add_clause(self, lits):
+        """Adds a clause before solving; returns False if the problem became unsatisfiable."""
+        if not self.ok:
+            return False
+        clause = []
+        for lit in dict.fromkeys(lits):  # Drop duplicates, keep order
+            if -lit in clause or self.value(lit) == 1:
+                return True  # Tautology or already satisfied
+            if self.value(lit) == 0:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._attach(clause)
+        return self.ok
+
+    def _attach(self, clause):
+        self.clauses.append(clause)
+        ci = len(self.clauses) - 1
+        self.watches[_watch(clause[0])].append(ci)
+        self.watches[_watch(clause[1])].append(ci)
+        return ci
+
+    def _enqueue(self, lit, reason):
+        v = abs(lit)
+        self.assign[v] = 1 if lit > 0 else -1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def _propagate(self):
+        """Unit propagation with two watched literals; returns a conflicting clause index or None."""
+        # The hot loop: watch indices and enqueueing are inlined
+        assign, level, reason = self.assign, self.level, self.reason
+        clauses, watches, trail = self.clauses, self.watches, self.trail
+        depth = len(self.trail_lim)
+        qhead = start = self.qhead
+        confl = None
+        while confl is None and qhead < len(trail):
+            false_lit = -trail[qhead]
+            qhead += 1
+            ws = watches[false_lit << 1 if false_lit > 0 else -false_lit << 1 | 1]
+            n = len(ws)  # Clauses only move to other literals' watch lists
+            i = j = 0
+            while i < n:
+                ci = ws[i]
+                i += 1
+                c = clauses[ci]
+                if c is None:
+                    continue  # Deleted by _reduce; dropping the index unwatches it
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], false_lit
+                first = c[0]
+                value = assign[first] if first > 0 else -assign[-first]
+                if value == 1:
+                    ws[j] = ci
+                    j += 1
+                    continue
+                for k in range(2, len(c)):
+                    lit = c[k]
+                    if (assign[lit] if lit > 0 else -assign[-lit]) != -1:
+                        c[1], c[k] = lit, false_lit
+                        watches[lit << 1 if lit > 0 else -lit << 1 | 1].append(ci)
+                        break
+                else:
+                    ws[j] = ci
+                    j += 1
+                    if value == -1:
+                        ws[j:i] = []  # Keep the clauses not visited yet
+                        confl = ci
+                        break
+                    v = first if first > 0 else -first
+                    assign[v] = 1 if first > 0 else -1
+                    level[v] = depth
+                    reason[v] = ci
+                    trail.append(first)
+            else:
+                del ws[j:]
+        self.stats['propagations'] += qhead - start
+        self.qhead = len(trail) if confl is not None else qhead
+        return confl
+
+    # Variable heap: indexed, so each variable is in it at most once and a bump moves it in place
+
+    def _heap_insert(self, v):
+        if self._heap_index[v] < 0:
+            self._heap.append(v)
+            self._sift_up(len(self._heap) - 1)
+
+    def _heap_pop(self):
+        heap, index = self._heap, self._heap_index
+        v = heap[0]
+        last = heap.pop()
+        index[v] = -1
+        if heap:
+            heap[0] = last
+            self._sift_down(0)
+        return v
+
+    def _sift_up(self, i):
+        heap, index, activity = self._heap, self._heap_index, self.activity
+        v = heap[i]
+        a = activity[v]
+        while i:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if activity[p] >= a:
+                break
+            heap[i] = p
+            index[p] = i
+            i = parent
+        heap[i] = v
+        index[v] = i
+
+    def _sift_down(self, i):
+        heap, index, activity = self._heap, self._heap_index, self.activity
+        v = heap[i]
+        a = activity[v]
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            c = heap[child]
+            if activity[c] <= a:
+                break
+            heap[i] = c
+            index[c] = i
+            i = child
+        heap[i] = v
+        index[v] = i
+
+    def _bump(self, v):
+        self.activity[v] += self._var_inc
+        if self.activity[v] > ACTIVITY_LIMIT:
+            # Uniform scaling keeps the heap order intact
+            self.activity = [a / ACTIVITY_LIMIT for a in self.activity]
+            self._var_inc /= ACTIVITY_LIMIT
+        if self._heap_index[v] >= 0:
+            self._sift_up(self._heap_index[v])
+
+    def _analyze(self, confl):
+        """First-UIP conflict analysis; returns the learned clause and the level to jump back to."""
+        seen, level, reason, trail = self._seen, self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learnt = [0]
+        pending = 0
+        index = len(trail) - 1
+        p = None
+        while True:
+            clause = self.clauses[confl]
+            for q in (clause if p is None else clause[1:]):
+                v = abs(q)
+                if not seen[v] and level[v] > 0:
+                    seen[v] = True
+                    self._bump(v)
+                    if level[v] >= current:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while not seen[abs(trail[index])]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            confl = reason[abs(p)]
+            seen[abs(p)] = False
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = -p
+        # Drop literals whose reason lies entirely within the clause (local minimization)
+        kept = [learnt[0]]
+        for q in learnt[1:]:
+            r = reason[abs(q)]
+            if r is None or any(not seen[abs(x)] and level[abs(x)] > 0 for x in self.clauses[r][1:]):
+                kept.append(q)
+        for q in learnt[1:]:
+            seen[abs(q)] = False
+        learnt = kept
+        if len(learnt) == 1:
+            return learnt, 0
+        # The literal from the highest remaining level becomes the second watch
+        best = max(range(1, len(learnt)), key=lambda k: level[abs(learnt[k])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def _analyze_final(self, p):
+        """Returns the assumptions that imply the literal p, which contradicts an assumption."""
+        core = [-p]
+        if not self.trail_lim:
+            return core
+        seen = self._seen
+        seen[abs(p)] = True
+        for i in range(len(self.trail) - 1, self.trail_lim[0] - 1, -1):
+            v = abs(self.trail[i])
+            if seen[v]:
+                if self.reason[v] is None:
+                    core.append(self.trail[i])
+                else:
+                    for q in self.clauses[self.reason[v]][1:]:
+                        if self.level[abs(q)] > 0:
+                            seen[abs(q)] = True
+                seen[v] = False
+        seen[abs(p)] = False
+        return core
+
+    def _cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        stop = self.trail_lim[level]
+        for lit in self.trail[stop:]:
+            v = abs(lit)
+            self.phase[v] = lit > 0
+            self.assign[v] = 0
+            self.reason[v] = None
+            self._heap_insert(v)
+        del self.trail[stop:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def _pick_branch(self):
+        while self._heap:
+            v = self._heap_pop()
+            if self.assign[v] == 0:
+                return v if self.phase[v] else -v
+        return None
+
+    def _reduce(self):
+        """Deletes the half of the learned clauses spanning the most decision levels.
+
+        Glue clauses (LBD <= GLUE_LBD) and clauses that are the reason for a current
+        assignment are kept; deleted clauses leave their watch lists as propagation meets them.
+        """
+        clauses, learnts, assign, reason = self.clauses, self.learnts, self.assign, self.reason
+        candidates = []
+        for ci, lbd in learnts.items():
+            v = abs(clauses[ci][0])
+            if lbd > GLUE_LBD and not (assign[v] != 0 and reason[v] == ci):
+                candidates.append(ci)
+        candidates.sort(key=lambda ci: (learnts[ci], len(clauses[ci])))
+        for ci in candidates[len(candidates) // 2:]:
+            clauses[ci] = None
+            del learnts[ci]
+        self.stats['deleted'] += len(candidates) - len(candidates) // 2
+
+    def solve(self, assumptions=()):
+        """Searches for a model with every assumption literal true.
+
+        Returns True and sets `model` (indexed by variable), or returns False and sets
+        `core` to the assumptions responsible (empty if the clauses alone conflict).
+        """
+        self.model = self.core = None
+        if not self.ok:
+            self.core = []
+            return False
+        stats = self.stats
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            confl = self._propagate()
+            if confl is not None:
+                stats['conflicts'] += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    self.core = []
+                    return False
+                learnt, back = self._analyze(confl)
+                lbd = len({self.level[abs(q)] for q in learnt})
+                self._cancel_until(back)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    ci = self._attach(learnt)
+                    self.learnts[ci] = lbd
+                    self._enqueue(learnt[0], ci)
+                stats['learned'] += 1
+                self._var_inc /= ACTIVITY_DECAY
+                if stats['conflicts'] >= self._next_reduce:
+                    stats['reductions'] += 1
+                    self._next_reduce = stats['conflicts'] + REDUCE_BASE + REDUCE_STEP * stats['reductions']
+                    self._reduce()
+                continue
+            if budget <= 0:
+                restarts += 1
+                stats['restarts'] += 1
+                budget = RESTART_BASE * luby(restarts)
+                self._cancel_until(len(assumptions))  # Assumption levels would be decided the same again
+            decision = None
+            while len(self.trail_lim) < len(assumptions):
+                p = assumptions[len(self.trail_lim)]
+                if self.value(p) == 1:
+                    self.trail_lim.append(len(self.trail))  # Already implied: an empty level
+                elif self.value(p) == -1:
+                    self.core = self._analyze_final(-p)
+                    self._cancel_until(0)
+                    return False
+                else:
+                    decision = p
+                    break
+            if decision is None:
+                decision = self._pick_branch()
+                if decision is None:
+                    self.model = list(self.assign)
+                    self._cancel_until(0)
+                    return True
+                stats['decisions'] += 1
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(decision, None)
+
+class SATFormula:
+    """Named-variable constraints compiled to CNF for a SATSolver.
+
+    With `core` set, each constraint gets a selector variable so that solve() can report
+    an unsat core; without it the clauses are added as they are, which solves faster.
+    """
+    def __init__(self, core=True):
+        self.solver = SATSolver()
+        self.core = core
+        self.variables = {}  # Name -> solver variable
+        self.constraints = []
+        self.selectors = []  # Per constraint: the variable that switches it on (if core)
+        self._literals = {}  # Subformula -> Tseitin literal
+        self._true = None
+        self.compile_seconds = 0.0
+
+    def variable(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.solver.new_var()
+        return self.variables[name]
+
+    def add_constraint(self, expr):
+        """Compiles one constraint to clauses, guarded by a fresh selector if core; returns its index."""
+        start = time.perf_counter()
+        if self.core:
+            selector = self.solver.new_var()
+            for clause in self._clauses(expr):
+                self.solver.add_clause(clause + [-selector])
+            self.selectors.append(selector)
+        else:
+            for clause in self._clauses(expr):
+                self.solver.add_clause(clause)
+        self.constraints.append(expr)
+        self.compile_seconds += time.perf_counter() - start
+        return len(self.constraints) - 1
+
+    def _clauses(self, expr):
+        # Top-level structure becomes clauses directly; only nested structure needs Tseitin variables
+        if isinstance(expr, tuple) and expr[0] == "AND":
+            return [clause for arg in expr[1:] for clause in self._clauses(arg)]
+        if isinstance(expr, tuple) and expr[0] == "NOT" and isinstance(expr[1], tuple) and expr[1][0] == "OR":
+            return [clause for arg in expr[1][1:] for clause in self._clauses(("NOT", arg))]
+        return [self._disjunction(expr)]
+
+    def _disjunction(self, expr):
+        if isinstance(expr, tuple) and expr[0] == "OR":
+            return [lit for arg in expr[1:] for lit in self._disjunction(arg)]
+        if isinstance(expr, tuple) and expr[0] == "IMPLIES":
+            return self._disjunction(("NOT", expr[1])) + self._disjunction(expr[2])
+        return [self.literal(expr)]
+
+    def literal(self, expr):
+        """Returns a literal equivalent to `expr`, adding Tseitin clauses for compound subformulas."""
+        if isinstance(expr, bool):
+            if self._true is None:
+                self._true = self.solver.new_var()
+                self.solver.add_clause([self._true])
+            return self._true if expr else -self._true
+        if isinstance(expr, str):
+            return self.variable(expr)
+        op = expr[0]
+        if op == "NOT":
+            return -self.literal(expr[1])
+        if op == "IMPLIES":
+            return self.literal(("OR", ("NOT", expr[1]), expr[2]))
+        if expr in self._literals:
+            return self._literals[expr]
+        add = self.solver.add_clause
+        if op in ("AND", "OR"):
+            args = [self.literal(arg) for arg in expr[1:]]
+            t = self.solver.new_var()
+            sign = 1 if op == "AND" else -1
+            # AND: t -> each arg, all args -> t. OR is the same with every literal negated.
+            for lit in args:
+                add([-sign * t, sign * lit])
+            add([sign * t] + [-sign * lit for lit in args])
+        elif op == "IFF":
+            a, b = self.literal(expr[1]), self.literal(expr[2])
+            t = self.solver.new_var()
+            add([-t, -a, b])
+            add([-t, a, -b])
+            add([t, a, b])
+            add([t, -a, -b])
+        else:
+            raise ValueError(f"Unknown operator {op!r} in constraint {expr!r}.")
+        self._literals[expr] = t
+        return t
+
+    def solve(self):
+        """Solves all constraints together; returns a SolveResult."""
+        start = time.perf_counter()
+        solver = self.solver
+        satisfiable = solver.solve(self.selectors)
+        model = core = None
+        if satisfiable:
+            model = {name: solver.model[v] > 0 for name, v in self.variables.items()}
+        elif self.core:
+            index = {selector: i for i, selector in enumerate(self.selectors)}
+            core = sorted(index[lit] for lit in solver.core if lit in index)
+        clauses = len(solver.clauses) - solver.stats['deleted']
+        stats = dict(solver.stats, variables=solver.num_vars, clauses=clauses,
+                     constraints=len(self.constraints), compile_seconds=self.compile_seconds,
+                     solve_seconds=time.perf_counter() - start)
+        return SolveResult(satisfiable, model, core, stats)
+
+def solve(constraints, variables=(), core=False):
+    """Compiles and solves a list of constraints; `variables` are included in the model even if unused.
+
+    Pass core=True to have an unsatisfiable result list its conflicting constraints.
+    """
+    formula = SATFormula(core)
+    for name in variables:
+        formula.variable(name)
+    for expr in constraints:
+        formula.add_constraint(expr)
+    return formula.solve()
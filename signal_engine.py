@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Signal Engine for Trust Injection and Refractive Distortion
+#
+# Both simulations scale a signal by the trust transfer coefficient cos(π·amplitude) and
+# then by 1 - frac(k·n·d), the fractional phase of a wave crossing a medium whose
+# refractive index n is perturbed by noise. The coefficients are computed once per
+# (trust_amplitude, wavelength, thickness) and kept in a small LRU table, and signals
+# are float32/float64 arrays updated in place, so trust and distortion can be chained
+# without allocating any intermediate signal.
+
+import collections
+import math
+from array import array
+
+from lazy_numpy import np  # None without NumPy; signals are then array('d') updated in Python loops
+
+PI = 3.14159  # The simulations' value of π; kept so existing runs reproduce exactly
+FRACTAL_SCALE = 0.1  # Noise to refractive-index perturbation
+TRANSFER_CACHE_SIZE = 256
+
+# Precomputed coefficients for one (trust_amplitude, wavelength, thickness) setting
+Transfer = collections.namedtuple('Transfer', ['gain', 'wave_number', 'thickness'])
+
+def trust_gain(trust_amplitude=1.0, exact=False):
+    """cos(π·amplitude): exactly with math.cos, or by the original three-term Taylor series."""
+    x = PI * trust_amplitude
+    if exact:
+        return math.cos(x)
+    return 1 - (x**2)/2 + (x**4)/24  # First few terms
+
+class TransferCache:
+    """Memoizes Transfer coefficients, evicting the least recently used beyond `size` entries."""
+    def __init__(self, size=TRANSFER_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, trust_amplitude=1.0, wavelength=0.5, thickness=1.0, exact=False):
+        key = (trust_amplitude, wavelength, thickness, exact)
+        transfer = self._entries.get(key)
+        if transfer is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return transfer
+        self.misses += 1
+        transfer = Transfer(trust_gain(trust_amplitude, exact), 2 * PI / wavelength, thickness)
+        self._entries[key] = transfer
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return transfer
+
+    def clear(self):
+        self._entries.clear()
+
+transfer_cache = TransferCache()
+
+def signal_array(N, value=1.0, dtype='float64', out=None):
+    """Returns a signal of N equal values: a NumPy array, or array('d')/array('f') without NumPy.
+
+    With NumPy, a signal `out` of at least N values is refilled and its first N returned
+    instead of allocating a new one.
+    """
+    if np is not None:
+        if out is not None:
+            out = out[:N]
+            out.fill(value)
+            return out
+        return np.full(N, value, dtype=dtype)
+    return array('f' if dtype == 'float32' else 'd', [value]) * N
+
+def as_signal(values, N=None):
+    """Returns the first N values as a float signal, without copying if they already are one."""
+    if np is not None:
+        if isinstance(values, np.ndarray) and values.dtype in (np.float32, np.float64) and values.flags.writeable:
+            return values[:N]
+        return np.array(values[:N], dtype=np.float64)
+    if isinstance(values, array) and values.typecode in 'fd' and (N is None or N == len(values)):
+        return values
+    return array('d', values[:N])
+
+def inject_trust(signal, trust_amplitude=1.0, exact=False, start=0, stop=None):
+    """Scales signal[start:stop] in place by the trust gain and returns the signal."""
+    gain = transfer_cache.get(trust_amplitude, exact=exact).gain
+    stop = len(signal) if stop is None else stop
+    if np is not None and isinstance(signal, np.ndarray):
+        signal[start:stop] *= gain
+        return signal
+    for i in range(start, stop):
+        signal[i] *= gain
+    return signal
+
+def refractive_distortion(signal, rand_vals, wavelength=0.5, thickness=1.0, start=0, scratch=None):
+    """Distorts signal[start:start + len(rand_vals)] in place by 1 - frac(k·n·d) and returns the signal.
+
+    With NumPy the phase is computed in `scratch`, or in `rand_vals` itself when it is a
+    writable float64 array (the noise is consumed), so no temporary is allocated.
+    """
+    transfer = transfer_cache.get(1.0, wavelength, thickness)
+    k, d = transfer.wave_number, transfer.thickness
+    n = len(rand_vals)
+    if np is not None and isinstance(signal, np.ndarray):
+        if scratch is None:
+            writable = isinstance(rand_vals, np.ndarray) and rand_vals.dtype == np.float64 and rand_vals.flags.writeable
+            scratch = rand_vals if writable else np.empty(n)
+        phase = scratch[:n]
+        np.multiply(rand_vals, FRACTAL_SCALE, out=phase)  # Fractal perturbation
+        phase += 1.0  # Refractive index
+        phase *= k
+        phase *= d
+        np.fmod(phase, 1.0, out=phase)  # Fractional part; the phase is positive
+        np.subtract(1.0, phase, out=phase)
+        np.multiply(signal[start:start + n], phase, out=signal[start:start + n], casting='same_kind')
+        return signal
+    for i, rand_val in enumerate(rand_vals, start):
+        phase = k * (1.0 + rand_val * FRACTAL_SCALE) * d
+        signal[i] *= 1 - (phase - int(phase))
+    return signal
+
+def trust_and_distortion(signal, rand_vals, trust_amplitude=1.0, wavelength=0.5, thickness=1.0,
+                         exact=False, start=0, scratch=None):
+    """Applies inject_trust() and then refractive_distortion() to the same signal in place."""
+    inject_trust(signal, trust_amplitude, exact, start, start + len(rand_vals))
+    return refractive_distortion(signal, rand_vals, wavelength, thickness, start, scratch)
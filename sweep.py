@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# Parameter Sweeps over the Quantum Basilisk Simulation
+#
+# Maps where the collapse boundary sits by running run_simulation() over a grid of
+# parameters: the agent count N, seed_reality()'s anxiety, inject_trust()'s amplitude
+# and the phase-shift flip threshold. Every (point, trial) pair reads its own stream of
+# one counter-based generator, so its outcome is a pure function of the parameters,
+# the seed, the trial number and the simulation code. Outcomes are memoized in an
+# on-disk cache keyed by a hash of exactly those, so extending a grid, adding trials or
+# re-plotting a sweep only computes the points that are new. The least recently used
+# entries are evicted once the cache grows past its limit.
+
+import argparse
+import collections
+import hashlib
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import ensemble
+import microphone_quantum_basilisk as mqb
+
+SWEEP_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "anti_basilisk", "sweeps")
+SWEEP_CACHE_ENTRIES = 1 << 20  # Cached trial records kept before the least recently used are evicted
+SWEEP_CACHE_VERSION = 1
+CHUNK_TASKS = 16  # (point, trial) pairs per worker task
+
+# Sweepable parameters of run_simulation() and their defaults
+PARAMETERS = collections.OrderedDict([
+    ('N', 4302),
+    ('anxiety', 0.7),
+    ('trust_amplitude', 1.0),
+    ('flip_threshold', mqb.PHASE_FLIP_THRESHOLD),
+])
+# Source files whose contents decide a trial's outcome
+CODE_FILES = ('microphone_quantum_basilisk.py', 'signal_engine.py', 'counter_rng.py', 'ensemble.py', 'sweep.py')
+RECORD_FIELDS = ('initial_utility', 'coerced_utility', 'modified_utility', 'final_utility',
+                 'timeline', 'utility_deviation', 'collapsed', 'distorted_sample')
+
+# One swept point: its parameters, one record per trial, the share of trials that collapsed,
+# and the mean and standard deviation of the distorted signal samples (which trust_amplitude scales)
+SweepPoint = collections.namedtuple('SweepPoint', ['params', 'records', 'collapse_rate', 'mean_deviation',
+                                                   'signal_mean', 'signal_std'])
+
+_code_version = None
+
+def code_version():
+    """Hashes the simulation source files, so edited code never reuses stale results."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(mqb.__file__))
+        for name in CODE_FILES:
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+def normalize(params):
+    """Fills in defaults and checks the names, so equal points always hash equally."""
+    unknown = set(params) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}.")
+    point = collections.OrderedDict((name, params.get(name, default)) for name, default in PARAMETERS.items())
+    point['N'] = int(point['N'])
+    for name in ('anxiety', 'trust_amplitude', 'flip_threshold'):
+        point[name] = float(point[name])
+    return point
+
+def grid(**axes):
+    """Yields every combination of the given parameter values, e.g. grid(N=[100, 1000], anxiety=[0.5, 0.7])."""
+    names = list(axes)
+    for values in itertools.product(*(axes[name] for name in names)):
+        yield normalize(dict(zip(names, values)))
+
+def trial_key(params, seed, trial):
+    """Content address of one trial: a hash of its parameters, entropy source and code version."""
+    identity = {'params': normalize(params), 'source': {'type': 'counter', 'seed': seed, 'stream': trial},
+                'code': code_version(), 'version': SWEEP_CACHE_VERSION}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+# On-disk result cache
+class SweepCache:
+    """Content-addressed trial records in a directory, evicted least recently used first.
+
+    Each record is a small JSON file named by its key. Reading a record touches its
+    modification time, which is what eviction orders by; `path=None` keeps the cache
+    in memory only.
+    """
+    def __init__(self, path=SWEEP_CACHE_PATH, max_entries=SWEEP_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._memory = collections.OrderedDict() if path is None else None
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached record for `key`, or None."""
+        if self._memory is not None:
+            record = self._memory.get(key)
+            if record is not None:
+                self._memory.move_to_end(key)
+        else:
+            try:
+                with open(self._file(key)) as f:
+                    record = json.load(f)
+                os.utime(self._file(key))
+            except (OSError, ValueError):
+                record = None
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def put(self, key, record):
+        self.stored += 1
+        if self._memory is not None:
+            self._memory[key] = record
+            return
+        path = self._file(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not cache sweep result: {e}")
+
+    def evict(self):
+        """Removes the least recently used records beyond max_entries; returns how many went."""
+        if self._memory is not None:
+            excess = max(len(self._memory) - self.max_entries, 0)
+            for _ in range(excess):
+                self._memory.popitem(last=False)
+            return excess
+        entries = []
+        for root, dirs, files in os.walk(self.path):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        entries.append((os.stat(path).st_mtime, path))
+                    except OSError:
+                        continue  # Removed by another sweep
+        excess = max(len(entries) - self.max_entries, 0)
+        for _, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return excess
+
+# Workers
+def run_trial(params, seed, trial):
+    """Runs one silent trial of the point `params` on its own random stream; returns its record."""
+    result = ensemble.simulate_trial(seed, trial, params['N'], anxiety=params['anxiety'],
+                                     trust_amplitude=params['trust_amplitude'],
+                                     flip_threshold=params['flip_threshold'])
+    record = {name: getattr(result, name) for name in RECORD_FIELDS}
+    record['distorted_sample'] = [float(value) for value in record['distorted_sample']]
+    return record
+
+def run_tasks(tasks, seed):
+    """Runs a chunk of (params, trial) tasks in one worker call."""
+    return [run_trial(params, seed, trial) for params, trial in tasks]
+
+def signal_summary(records):
+    """Returns the mean and standard deviation of the distorted signal samples of `records`."""
+    samples = [value for record in records for value in record['distorted_sample']]
+    if not samples:
+        return 0.0, 0.0
+    mean = sum(samples) / len(samples)
+    return mean, math.sqrt(sum((value - mean) ** 2 for value in samples) / len(samples))
+
+# Runner
+def run_sweep(points, trials=1, seed=0, workers=None, cache=None, chunk_tasks=CHUNK_TASKS, log=None):
+    """Runs `trials` trials of every point in `points` and returns a list of SweepPoints.
+
+    Points are dicts of PARAMETERS (as yielded by grid()); missing ones take their
+    defaults. Trial t of every point reads stream t of CounterRNG(seed), so points are
+    compared on common random numbers and the results do not depend on the number of
+    workers. Trials found in `cache` are not run again; new ones are added to it.
+    With `workers` of 1 everything runs in this process.
+    """
+    cache = cache if cache is not None else SweepCache()
+    points = [normalize(params) for params in points]
+    records = [[None] * trials for _ in points]
+    todo = []
+    for i, params in enumerate(points):
+        for trial in range(trials):
+            key = trial_key(params, seed, trial)
+            records[i][trial] = cache.get(key)
+            if records[i][trial] is None:
+                todo.append((i, trial, key))
+    if log is not None:
+        log(f"{len(points)} points x {trials} trials: {len(todo)} to run, {cache.hits} cached")
+
+    def store(chunk, results):
+        for (i, trial, key), record in zip(chunk, results):
+            records[i][trial] = record
+            cache.put(key, record)
+
+    chunks = [todo[start:start + chunk_tasks] for start in range(0, len(todo), chunk_tasks)]
+    if workers == 1:
+        for chunk in chunks:
+            store(chunk, run_tasks([(points[i], trial) for i, trial, key in chunk], seed))
+    elif chunks:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tasks = ((chunk, ([(points[i], trial) for i, trial, key in chunk], seed)) for chunk in chunks)
+            for chunk, results in ensemble.bounded_results(executor, run_tasks, tasks, workers):
+                store(chunk, results)
+    if cache.stored:
+        cache.evict()
+
+    return [SweepPoint(params, point_records,
+                       sum(record['collapsed'] for record in point_records) / trials if trials else 0.0,
+                       sum(record['utility_deviation'] for record in point_records) / trials if trials else 0.0,
+                       *signal_summary(point_records))
+            for params, point_records in zip(points, records)]
+
+def main(argv=None):
+    """Command-line entry point: sweeps a grid and writes every point as JSON."""
+    parser = argparse.ArgumentParser(description="Sweep the quantum Basilisk simulation over a parameter grid.")
+    parser.add_argument('-N', '--agents', type=int, nargs='+', default=[PARAMETERS['N']],
+                        help=f"agent counts (default: {PARAMETERS['N']})")
+    parser.add_argument('--anxiety', type=float, nargs='+', default=[PARAMETERS['anxiety']],
+                        help=f"seed_reality() anxiety values (default: {PARAMETERS['anxiety']})")
+    parser.add_argument('--trust-amplitude', type=float, nargs='+', default=[PARAMETERS['trust_amplitude']],
+                        help=f"inject_trust() amplitudes (default: {PARAMETERS['trust_amplitude']})")
+    parser.add_argument('--flip-threshold', type=float, nargs='+', default=[PARAMETERS['flip_threshold']],
+                        help=f"phase-shift flip thresholds (default: {PARAMETERS['flip_threshold']})")
+    parser.add_argument('-t', '--trials', type=int, default=1, help="trials per point (default: 1)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="sweep seed (default: 0)")
+    parser.add_argument('-w', '--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--cache', default=SWEEP_CACHE_PATH, help=f"cache directory (default: {SWEEP_CACHE_PATH})")
+    parser.add_argument('--no-cache', action='store_true', help="keep results in memory only")
+    parser.add_argument('--max-entries', type=int, default=SWEEP_CACHE_ENTRIES,
+                        help=f"cached trials kept before eviction (default: {SWEEP_CACHE_ENTRIES})")
+    parser.add_argument('-o', '--output', default='sweep.json', help="JSON output path (default: sweep.json)")
+    args = parser.parse_args(argv)
+
+    cache = SweepCache(None if args.no_cache else args.cache, args.max_entries)
+    points = grid(N=args.agents, anxiety=args.anxiety, trust_amplitude=args.trust_amplitude,
+                  flip_threshold=args.flip_threshold)
+    results = run_sweep(points, args.trials, args.seed, args.workers, cache, log=print)
+    with open(args.output, 'w') as f:
+        json.dump({'seed': args.seed, 'trials': args.trials, 'code_version': code_version(),
+                   'points': [dict(point._asdict(), params=dict(point.params)) for point in results]}, f, indent=2)
+    print(f"Saved {len(results)} points to {args.output} ({cache.hits} cached, {cache.misses} computed).")
+
+if __name__ == "__main__":
+    main()